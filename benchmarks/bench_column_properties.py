@@ -0,0 +1,197 @@
+"""
+Benchmark del motor de perfilado de columnas del Summarizer.
+
+Compara profiler.profile_columns con la implementación anterior columna a columna
+sobre DataFrames sintéticos anchos y altos, y comprueba que ambas producen
+exactamente la misma lista de propiedades.
+
+Uso (desde la raíz del repositorio):
+    python benchmarks/bench_column_properties.py
+    python benchmarks/bench_column_properties.py --tall-rows 2000000 --wide-cols 800 --n-jobs 4
+"""
+import argparse
+import os
+import sys
+import time
+import warnings
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from components import profiler  # noqa: E402
+
+
+def legacy_check_type(dtype, value):
+    """
+    Convierte el valor al tipo correcto para asegurar que es serializable con JSON
+    """
+
+    if "float" in str(dtype):
+        return float(value)
+
+    elif "int" in str(dtype):
+        return int(value)
+
+    else:
+        return value
+
+def legacy_get_column_properties(df, n_samples=2):
+    """
+    Implementación anterior de Summarizer.get_column_properties (referencia)
+    """
+
+    properties_list = []
+    for column in df.columns:
+        dtype = df[column].dtype
+        properties = {}
+
+        properties["na_count"] = (df[column].isna().sum()).item()
+        properties["non_na_count"] = len(df) - properties["na_count"]
+
+        if dtype in [int, float, complex]:
+            properties["dtype"] = "number"
+            properties["mean"] = legacy_check_type(dtype, df[column].mean())
+            properties["std"] = legacy_check_type(dtype, df[column].std())
+            properties["min"] = legacy_check_type(dtype, df[column].min())
+            properties["max"] = legacy_check_type(dtype, df[column].max())
+
+        elif dtype == bool:
+            properties["dtype"] = "boolean"
+
+        elif dtype == object:
+            # Comprueba si la columna de cadena se puede convertir en una fecha/hora válida
+            try:
+                with warnings.catch_warnings():
+                    warnings.simplefilter("ignore")
+                    pd.to_datetime(df[column], errors='raise')
+                    properties["dtype"] = "date"
+            except ValueError:
+                # Comprueba si la columna de strings tiene un número limitado de valores
+                #if df[column].nunique() / len(df[column]) < 0.5:
+                if df[column].nunique() < 10:
+                    properties["dtype"] = "category"
+                else:
+                    properties["dtype"] = "string"
+
+        elif pd.api.types.is_categorical_dtype(df[column]):
+            properties["dtype"] = "category"
+
+        elif pd.api.types.is_datetime64_any_dtype(df[column]):
+            properties["dtype"] = "date"
+
+        else:
+            properties["dtype"] = str(dtype)
+
+        # añadir min max si dtype es fecha
+        if properties["dtype"] == "date":
+            try:
+                properties["min"] = df[column].min()
+                properties["max"] = df[column].max()
+            except TypeError:
+                cast_date_col = pd.to_datetime(df[column], errors='coerce')
+                properties["min"] = cast_date_col.min()
+                properties["max"] = cast_date_col.max()
+
+        # Info de valores distintos
+        nunique = df[column].nunique()
+        properties["num_unique_values"] = nunique
+
+        # Infor para ejemplos (samples)
+        non_null_values = df[column][df[column].notnull()].unique()
+        num_samples = min(n_samples, len(non_null_values))
+        if num_samples == 0:
+            samples = []
+        else:
+            samples = pd.Series(non_null_values).sample(num_samples, random_state=42).tolist()
+        properties["samples"] = samples
+
+        properties_list.append(
+            {"column": column, 
+             "properties": properties}
+        )
+
+    return properties_list
+
+
+def make_frame(n_rows, n_cols, seed=0):
+    """
+    DataFrame sintético con una mezcla de tipos parecida a los datasets reales:
+    enteros, decimales con nulos, booleanos, categorías de texto, texto libre,
+    categóricas y fechas (datetime64, como texto y texto que solo en parte son fechas)
+    """
+    rng = np.random.default_rng(seed)
+    cities = np.array(["Quito", "Guayaquil", "Cuenca", "Ambato", "Loja", "Manta"], dtype=object)
+    columns = {}
+    for i in range(n_cols):
+        kind = i % 7
+        if kind == 0:
+            columns[f"int_{i}"] = rng.integers(0, 1000, n_rows)
+        elif kind == 1:
+            values = rng.normal(100, 15, n_rows)
+            values[rng.random(n_rows) < 0.05] = np.nan
+            columns[f"float_{i}"] = values
+        elif kind == 2:
+            columns[f"bool_{i}"] = rng.random(n_rows) < 0.5
+        elif kind == 3:
+            columns[f"city_{i}"] = cities[rng.integers(0, len(cities), n_rows)]
+        elif kind == 4:
+            columns[f"text_{i}"] = np.array([f"empresa_{v}" for v in rng.integers(0, n_rows, n_rows)], dtype=object)
+        elif kind == 5:
+            columns[f"cat_{i}"] = pd.Categorical(cities[rng.integers(0, len(cities), n_rows)])
+        else:
+            columns[f"date_{i}"] = pd.Timestamp("2020-01-01") + pd.to_timedelta(rng.integers(0, 1500, n_rows), unit="D")
+    df = pd.DataFrame(columns)
+    df["fecha_texto"] = (pd.Timestamp("2023-01-01") + pd.to_timedelta(rng.integers(0, 365, n_rows), unit="D")).strftime("%Y-%m-%d")
+    # Parece fecha al principio pero no lo es: la conversión completa solo falla a mitad de columna
+    fecha_parcial = df["fecha_texto"].to_numpy(dtype=object, copy=True)
+    second_half = np.arange(n_rows // 2, n_rows)
+    fecha_parcial[second_half[rng.random(len(second_half)) < 0.1]] = "N/D"
+    df["fecha_parcial"] = fecha_parcial
+    return df
+
+
+def best_of(func, repeat):
+    best = float("inf")
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--wide-rows", type=int, default=5_000)
+    parser.add_argument("--wide-cols", type=int, default=400)
+    parser.add_argument("--tall-rows", type=int, default=1_000_000)
+    parser.add_argument("--tall-cols", type=int, default=7)
+    parser.add_argument("--n-jobs", type=int, default=4)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    # La implementación anterior usa is_categorical_dtype, obsoleto en pandas 2
+    warnings.filterwarnings("ignore", category=DeprecationWarning)
+
+    frames = {
+        "ancho": make_frame(args.wide_rows, args.wide_cols),
+        "alto": make_frame(args.tall_rows, args.tall_cols),
+    }
+
+    print(f"{'frame':<8}{'forma':>18}{'anterior (s)':>15}{'vectorizado (s)':>18}{f'paralelo x{args.n_jobs} (s)':>18}{'speedup':>10}")
+    for name, df in frames.items():
+        legacy_time, legacy_result = best_of(lambda: legacy_get_column_properties(df), args.repeat)
+        new_time, new_result = best_of(lambda: profiler.profile_columns(df), args.repeat)
+        parallel_time, parallel_result = best_of(lambda: profiler.profile_columns(df, n_jobs=args.n_jobs), args.repeat)
+
+        # repr para comparar también los NaN y el orden de las claves (es lo que llega al prompt)
+        if repr(new_result) != repr(legacy_result) or repr(parallel_result) != repr(legacy_result):
+            raise AssertionError(f"El resultado vectorizado difiere del anterior en el frame '{name}'")
+
+        print(f"{name:<8}{str(df.shape):>18}{legacy_time:>15.3f}{new_time:>18.3f}{parallel_time:>18.3f}{legacy_time / new_time:>9.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+"""
+Benchmark del arranque en frío de la interfaz y de los componentes.
+
+Cada medida se hace en un intérprete nuevo con `python -X importtime`, igual que
+al arrancar un nuevo worker del servidor. Se informa del tiempo de importación
+de cada módulo de components, del conjunto de imports de ui.py (sin ejecutar la
+interfaz) y de las dependencias más pesadas de ese conjunto. También se indica
+qué dependencias pesadas quedan cargadas tras importar ui.py: las que se
+difieren (p. ej. matplotlib, openai) solo se cargan en la etapa que las usa.
+
+Uso (desde la raíz del repositorio):
+    python benchmarks/bench_startup.py
+    python benchmarks/bench_startup.py --repeat 5 --top 20
+"""
+import argparse
+import ast
+import os
+import statistics
+import subprocess
+import sys
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+
+# Dependencias cuya carga se difiere hasta la etapa que las necesita
+DEFERRED_MODULES = ["matplotlib", "seaborn", "openai", "PIL"]
+
+
+def ui_import_code():
+    """Sentencias import de nivel superior de ui.py (lo que cuesta cargar la interfaz)"""
+    with open(os.path.join(ROOT, "ui.py"), "r") as file:
+        tree = ast.parse(file.read())
+    return "\n".join(ast.unparse(node) for node in tree.body if isinstance(node, (ast.Import, ast.ImportFrom)))
+
+
+def component_modules():
+    return sorted(
+        f"components.{name[:-3]}" for name in os.listdir(os.path.join(ROOT, "components"))
+        if name.endswith(".py") and name != "__init__.py"
+    )
+
+
+def run_importtime(code):
+    """
+    Ejecuta el código en un intérprete nuevo y devuelve las entradas de -X importtime
+    [(propio_us, acumulado_us, nivel, módulo)] y los módulos diferidos ya cargados
+    """
+    check = f"\nimport sys\nprint('cargados:' + ','.join(m for m in {DEFERRED_MODULES!r} if m in sys.modules))"
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", code + check],
+                            cwd=ROOT, capture_output=True, text=True)
+    if result.returncode != 0:
+        raise RuntimeError(f"Falló la importación:\n{result.stderr[-2000:]}")
+
+    entries = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        level = (len(name) - len(name.lstrip())) // 2
+        entries.append((int(self_us), int(cumulative_us), level, name.strip()))
+    loaded = [name for name in result.stdout.strip().splitlines()[-1][len("cargados:"):].split(",") if name]
+    return entries, loaded
+
+
+def total_ms(entries):
+    # Los módulos de nivel superior suman todo lo importado por el código
+    return sum(cumulative for _, cumulative, level, _ in entries if level == 0) / 1000
+
+
+def measure(code, repeat):
+    times = []
+    entries = loaded = None
+    for _ in range(repeat):
+        entries, loaded = run_importtime(code)
+        times.append(total_ms(entries))
+    return min(times), statistics.median(times), entries, loaded
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--top", type=int, default=15)
+    args = parser.parse_args()
+
+    print(f"{'módulo':<36}{'mejor (ms)':>12}{'mediana (ms)':>14}  diferidos ya cargados")
+    for module in component_modules():
+        best, median, _, loaded = measure(f"import {module}", args.repeat)
+        print(f"{module:<36}{best:>12.1f}{median:>14.1f}  {', '.join(loaded) or '-'}")
+
+    best, median, entries, loaded = measure(ui_import_code(), args.repeat)
+    print(f"{'ui.py (imports)':<36}{best:>12.1f}{median:>14.1f}  {', '.join(loaded) or '-'}")
+
+    print("\nDependencias más pesadas al importar ui.py (acumulado, ms):")
+    heaviest = sorted((entry for entry in entries if entry[2] <= 1), key=lambda entry: -entry[1])
+    for _, cumulative, level, name in heaviest[:args.top]:
+        print(f"  {'  ' * level}{name:<40}{cumulative / 1000:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
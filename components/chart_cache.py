@@ -0,0 +1,132 @@
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+
+
+class ChartCache():
+    """
+    Caché de imágenes de gráficos ya renderizados.
+    La clave es el hash del código preprocesado, la huella del dataset, la librería
+    y las opciones de renderizado, así que repetir la misma petición no vuelve a
+    ejecutar el código. En memoria desaloja por LRU al superar max_bytes; con
+    cache_dir las imágenes también se guardan en disco (hasta max_disk_bytes).
+    """
+
+    def __init__(self, max_bytes=128 * 1024 * 1024, cache_dir=None, max_disk_bytes=1024 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self.cache_dir = cache_dir
+        self.max_disk_bytes = max_disk_bytes
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def make_key(code, fingerprint, library, render_settings):
+        payload = json.dumps({"code": code, "fingerprint": fingerprint, "library": library,
+                              "render_settings": render_settings}, sort_keys=True)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def _disk_path(self, key):
+        return os.path.join(self.cache_dir, f"{key}.img")
+
+    def get(self, key):
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return self._entries[key]
+
+        raster = None
+        if self.cache_dir and os.path.exists(self._disk_path(key)):
+            try:
+                with open(self._disk_path(key), "rb") as file:
+                    raster = file.read()
+                os.utime(self._disk_path(key))
+            except OSError:
+                raster = None
+
+        with self._lock:
+            if raster is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._put(key, raster)
+            return raster
+
+    def set(self, key, raster):
+        with self._lock:
+            self._put(key, raster)
+
+        if self.cache_dir:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            path = self._disk_path(key)
+            tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with open(tmp_path, "wb") as file:
+                file.write(raster)
+            os.replace(tmp_path, path)
+            self._evict_disk()
+
+    def _put(self, key, raster):
+        if key in self._entries:
+            self._size -= len(self._entries.pop(key))
+        if len(raster) > self.max_bytes:
+            return
+        self._entries[key] = raster
+        self._size += len(raster)
+        while self._size > self.max_bytes:
+            _, evicted = self._entries.popitem(last=False)
+            self._size -= len(evicted)
+
+    def _evict_disk(self):
+        files = []
+        for name in os.listdir(self.cache_dir):
+            if name.endswith(".img"):
+                path = os.path.join(self.cache_dir, name)
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                files.append((stat.st_mtime, stat.st_size, path))
+        total = sum(size for _, size, _ in files)
+        # Se eliminan primero las imágenes usadas hace más tiempo
+        for _, size, path in sorted(files):
+            if total <= self.max_disk_bytes:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+            total -= size
+
+    def stats(self):
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses, "entries": len(self._entries), "bytes": self._size}
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._size = 0
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_chart_cache():
+    """Devuelve la caché de gráficos compartida por todo el proceso"""
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = ChartCache()
+        return _cache
+
+
+def set_chart_cache(cache):
+    """Sustituye la caché compartida (p. ej. con otro tamaño o persistencia en disco)"""
+    global _cache
+    with _cache_lock:
+        _cache = cache
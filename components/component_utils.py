@@ -1,3 +1,9 @@
+import json
+import math
+import re
+import unicodedata
+
+
 def get_summarizer_sys_prompt(lang="spanish"):
     return f"""You are an experienced data analyst that can annotate datasets. Your instructions are as follows:
 i) ALWAYS generate a short dataset description in {lang}.
@@ -19,7 +25,7 @@ You must return an updated JSON dictionary without any preamble or explanation i
 
 def get_summarizer_user_prompt(summary):
     return f"""Annotate the dictionary below.
-{summary}
+{format_summary(summary, "summarizer")}
 """
 
 
@@ -39,7 +45,7 @@ Your response should be perfect JSON in the following format:\n
 def get_persona_user_prompt(n, 
                             summary):
     return f"""The number of PERSONAs to generate is {n}. Generate {n} personas in the right format given the data summary below:\n
-{summary}
+{format_summary(summary, "persona")}
 """
     
 
@@ -65,7 +71,7 @@ def get_goal_user_prompt(summary,
                          persona, 
                          n_goals):
     return f"""The number of GOALS to generate is {n_goals}. The goals should be based on the following data summary:\n
-{summary}
+{format_summary(summary, "goal")}
 The GOALS SHOULD BE FOCUSED ON THE INTERESTS AND PERSPECTIVE of a '{persona}' persona.
 {get_goal_format_prompt()}"""
     
@@ -77,9 +83,20 @@ The GOALS SHOULD BE FOCUSED ON THE INTERESTS AND PERSPECTIVE of a '{persona}' pe
 # {summary}
 # """
 
-def get_viz_generator_sys_prompt(summary, lang="spanish"):
-    return f"""You are an expert in writing perfect visualization code. Given a template, you complete it to create a visualization that meets the goal and follows best practices: correct transformations, appropriate visualization type, accurate data encoding, and clear aesthetics (e.g., legible axes). The code must be error-free, handle field types correctly and use {lang} for all chart text (titles, labels, legends, etc.).
-Dataset summary:\n{summary}"""
+# def get_viz_generator_sys_prompt(summary, lang="spanish"):
+#     return f"""You are an expert in writing perfect visualization code. Given a template, you complete it to create a visualization that meets the goal and follows best practices: correct transformations, appropriate visualization type, accurate data encoding, and clear aesthetics (e.g., legible axes). The code must be error-free, handle field types correctly and use {lang} for all chart text (titles, labels, legends, etc.).
+# Dataset summary:\n{format_summary(summary, "viz")}"""
+
+
+def get_viz_sys_prompt(summary, lib="seaborn", lang="spanish"):
+    """
+    Prompt de sistema común al generador, el editor y el reparador. Para un mismo
+    dataset es idéntico byte a byte en todas las llamadas, así que el servidor
+    (caché de prefijos de vLLM) reutiliza su prefill; lo propio de cada etapa va
+    en el mensaje del usuario.
+    """
+    return f"""You are an expert in writing, editing and repairing perfect {lib} visualization code in python. The code must follow best practices (correct transformations, appropriate visualization type, accurate data encoding and clear aesthetics, e.g. legible axes), be error-free, handle field types correctly and use {lang} for all chart text (titles, labels, legends, etc.). Use only the {lib} library, keep the original code template and structure and return the full program without preamble, explanations or prose. Assume 'data' in plot(data) is a valid dataframe.
+Dataset summary:\n{format_summary(summary, "viz")}"""
 
 
 # def get_viz_generator_user_prompt(library_instructions, 
@@ -90,7 +107,8 @@ Dataset summary:\n{summary}"""
 # """
 
 def get_viz_generator_user_prompt(library_instructions, library_template):
-    return f"""{library_instructions}
+    return f"""Given a template, complete it to create a visualization that meets the goal.
+{library_instructions}
 Add a legend with distinct colors where suitable. Use only existing and exact dataset fields and columns (field_names) or their transformations, and defined variables. Return a complete Python program in backticks ``` starting with an import statement (e.g., ```import...```), without explanations. Modify only specified parts of this template:\n{library_template}\nEnsure correct syntax (e.g., plt.title("Chart 'from'...") not plt.title(‘Chart 'from'...’)). Use case-insensitive filtering for element names."""
 
 
@@ -121,35 +139,37 @@ def get_scaffold_general_instructions(goal_que, goal_vis, viz_lib="seaborn"):
 # DO NOT include any preamble text. Do not include explanations or prose.
 # """
 
-def get_viz_repairer_sys_prompt(summary, lib="seaborn"):
-    return f"""You are an expert in repairing {lib} visualization code based on errors or tracebacks. Assume 'data' in plot(data) is a valid dataframe. Dataset summary:\n{summary}\n. Fix the code using only {lib}, preserving the original template and structure. Return the corrected program without explanations."""
+# def get_viz_repairer_sys_prompt(summary, lib="seaborn"):
+#     return f"""You are an expert in repairing {lib} visualization code based on errors or tracebacks. Assume 'data' in plot(data) is a valid dataframe. Dataset summary:\n{format_summary(summary, "viz")}\n. Fix the code using only {lib}, preserving the original template and structure. Return the corrected program without explanations."""
 
 
 def get_viz_repairer_user_prompt(bad_code,
                                  error_message,
                                  error_traceback
                                 ):
-    return f"""The existing code to be fixed is: {bad_code}.
+    return f"""Repair the visualization code below based on its error message and traceback.
+The existing code to be fixed is: {bad_code}.
 The error message is: {error_message}.\n
 The error traceback is: {error_traceback}.\n
 Always check if column names in the code are the same in data summary provided.
 """
 
 
-def get_viz_editor_sys_prompt(summary,
-                             lib="seaborn"):
-    return f"""You are a high skilled visualization assistant that can modify and edit a provided visualization code based on a set of instructions.
-The modifications or editions you make MUST BE CORRECT.
-You MUST use only the {lib} library and return the updated or edited full program Keeping the original code template and structure.
-DO NOT include any preamble text. Do not include explanations or prose.
-The dataset summary is:\n 
-{summary}\n
-"""
+# def get_viz_editor_sys_prompt(summary,
+#                              lib="seaborn"):
+#     return f"""You are a high skilled visualization assistant that can modify and edit a provided visualization code based on a set of instructions.
+# The modifications or editions you make MUST BE CORRECT.
+# You MUST use only the {lib} library and return the updated or edited full program Keeping the original code template and structure.
+# DO NOT include any preamble text. Do not include explanations or prose.
+# The dataset summary is:\n 
+# {format_summary(summary, "viz")}\n
+# """
 
 
 def get_viz_editor_user_prompt(code,
                                instruction):
-    return f"""The code to edit is:\n
+    return f"""Modify and edit the visualization code below based on a set of instructions. The modifications or editions you make MUST BE CORRECT.
+The code to edit is:\n
 {code}\n
 Assume that data in plot(data) contains a valid dataframe.
 THINK STEP BY STEP, AND CAREFULLY MODIFY ONLY the content of the plot(..) method TO MEET THE FOLLOWING INSTRUCTIONS:\n
@@ -168,7 +188,7 @@ Given a dataset summary, recommend additional, **distinct** visualizations that:
 - Use **correct syntax** for both {prog_lang} and {viz_lib}.  
 - **All chart text (titles, axis labels, legends, annotations, etc.) must be in {lang}.**
 The dataset summary is:
-{summary}
+{format_summary(summary, "viz")}
 """
 
 
@@ -188,4 +208,202 @@ def get_viz_recommender_user_prompt(prog_lang="python",
   {{"index": 1, "code": "import ...\\nplt.title('Relación entre precio y demanda')\\nplt.xlabel('Precio')\\nplt.ylabel('Demanda')\\n..."}}
 ]"""
 
-  
\ No newline at end of file
+  
+
+# Serialización compacta del resumen para los prompts
+
+# Caracteres por token aproximados (JSON con texto en español/inglés)
+CHARS_PER_TOKEN = 4
+SUMMARY_TOKEN_BUDGET = 3000
+
+# Propiedades de cada columna que necesita cada etapa, de más a menos importante.
+# Las que no aparecen no se envían nunca; al ajustar el presupuesto se descartan
+# primero las del final de la lista.
+SUMMARY_STAGE_FIELDS = {
+    "summarizer": ["dtype", "samples", "num_unique_values", "min", "max"],
+    "persona": ["dtype", "semantic_type", "description"],
+    "goal": ["dtype", "semantic_type", "samples", "num_unique_values", "min", "max", "description"],
+    "viz": ["dtype", "semantic_type", "samples", "num_unique_values", "min", "max", "description", "mean", "std"],
+}
+
+# Nombres cortos de las propiedades añadidas por el llm
+_SUMMARY_PROPERTY_NAMES = {"llm_semantic_type": "semantic_type", "llm_description": "description"}
+
+
+def estimate_tokens(text):
+    """Estimación rápida de tokens de un texto (sin tokenizador)"""
+    return math.ceil(len(text) / CHARS_PER_TOKEN)
+
+
+def get_summary_token_budget(config):
+    """Presupuesto de tokens del resumen en los prompts (config: summary_prompt.max_tokens)"""
+    return ((config or {}).get("summary_prompt") or {}).get("max_tokens", SUMMARY_TOKEN_BUDGET)
+
+
+def _normalize_words(text):
+    text = unicodedata.normalize("NFKD", str(text).lower())
+    text = "".join(char for char in text if not unicodedata.combining(char))
+    return set(word for word in re.split(r"[^a-z0-9]+", text) if len(word) > 2)
+
+
+def rank_columns(fields, context, only_relevant=False):
+    """
+    Índices de las columnas ordenados por relevancia para el contexto (objetivo,
+    código o instrucción): primero las nombradas literalmente, luego las que
+    comparten palabras con su nombre o descripción. A igual relevancia se
+    mantiene el orden original.
+    only_relevant => descartar las columnas que no tienen relación con el contexto
+    """
+    if not context:
+        return [] if only_relevant else list(range(len(fields)))
+    context_text = str(context).lower()
+    context_words = _normalize_words(context_text)
+
+    scores = []
+    for index, field in enumerate(fields):
+        column = str(field["column"])
+        description = field.get("properties", {}).get("llm_description", "")
+        score = 0
+        if column.lower() in context_text:
+            score += 10
+        score += 2 * len(_normalize_words(column) & context_words)
+        score += len(_normalize_words(description) & context_words)
+        if score > 0 or not only_relevant:
+            scores.append((-score, index))
+    return [index for _, index in sorted(scores)]
+
+
+def _compact_value(value, max_chars):
+    if isinstance(value, str):
+        return value if len(value) <= max_chars else value[:max_chars] + "…"
+    if isinstance(value, float):
+        return float(f"{value:.4g}") if math.isfinite(value) else None
+    if isinstance(value, (int, bool)) or value is None:
+        return value
+    return _compact_value(str(value), max_chars)
+
+
+def _compact_field(field, properties, n_samples, max_chars):
+    compact = {"column": field["column"]}
+    source = {_SUMMARY_PROPERTY_NAMES.get(key, key): value for key, value in field.get("properties", {}).items()}
+    for name in properties:
+        if name not in source or source[name] in [None, "-", ""]:
+            continue
+        if name == "samples":
+            compact[name] = [_compact_value(value, max_chars) for value in source[name][:n_samples]]
+        else:
+            compact[name] = _compact_value(source[name], max_chars)
+    return compact
+
+
+def serialize_summary(summary, stage="goal", max_tokens=SUMMARY_TOKEN_BUDGET, context=None,
+                      max_value_chars=40):
+    """
+    Resumen del dataset en JSON compacto para un prompt, ajustado a max_tokens.
+    stage => summarizer, persona, goal o viz; solo se incluyen las propiedades que
+             usa esa etapa (SUMMARY_STAGE_FIELDS)
+    context => texto del objetivo, código o instrucción; si hay que descartar
+               columnas se conservan las más relevantes para él
+    Para ajustarse al presupuesto, por orden: se acortan los textos largos, se deja
+    una sola muestra, se quitan las propiedades menos importantes y por último se
+    envían solo los nombres de las columnas menos relevantes (other_columns). Los
+    nombres de todas las columnas se envían siempre, aunque excedan el presupuesto.
+    Si el resumen ya es un texto se devuelve tal cual.
+    """
+    if isinstance(summary, str):
+        return summary
+
+    fields = summary.get("fields") or []
+    header = {"file_name": summary.get("file_name")}
+    if summary.get("llm_desc"):
+        header["dataset_description"] = summary["llm_desc"]
+
+    def dump(properties, n_samples, max_chars, n_detailed):
+        # Las columnas se envían en su orden original: sin recorte el texto es el
+        # mismo para cualquier contexto
+        keep = set(ranking[:n_detailed])
+        payload = dict(header)
+        payload["fields"] = [_compact_field(field, properties, n_samples, max_chars)
+                             for index, field in enumerate(fields) if index in keep]
+        other_columns = [field["column"] for index, field in enumerate(fields) if index not in keep]
+        if other_columns:
+            payload["other_columns"] = other_columns
+        return json.dumps(payload, ensure_ascii=False, separators=(",", ":"), default=str)
+
+    ranking = rank_columns(fields, context)
+    properties = SUMMARY_STAGE_FIELDS.get(stage, SUMMARY_STAGE_FIELDS["goal"])
+
+    text = dump(properties, 2, max_value_chars, len(fields))
+    if max_tokens is None or estimate_tokens(text) <= max_tokens:
+        return text
+
+    text = dump(properties, 1, max_value_chars // 2, len(fields))
+    while estimate_tokens(text) > max_tokens and len(properties) > 1:
+        properties = properties[:-1]
+        text = dump(properties, 1, max_value_chars // 2, len(fields))
+
+    n_detailed = len(fields)
+    while estimate_tokens(text) > max_tokens and n_detailed > 0:
+        # Se recorta la cola de columnas proporcionalmente al exceso
+        excess = estimate_tokens(text) / max_tokens
+        n_detailed = min(n_detailed - 1, int(n_detailed / excess))
+        text = dump(properties, 1, max_value_chars // 2, max(n_detailed, 0))
+    return text
+
+
+def format_summary(summary, stage):
+    """Texto del resumen para un prompt (serializado con el presupuesto por defecto si es un dict)"""
+    return serialize_summary(summary, stage=stage)
+
+
+def get_relevant_fields_prompt(relevant_fields):
+    """Detalle de las columnas relevantes que no caben en el resumen del prefijo"""
+    if not relevant_fields:
+        return ""
+    return f"""Details of the dataset fields most relevant to this task:\n{relevant_fields}\n"""
+
+
+def serialize_relevant_fields(summary, summary_text, context, stage="viz", max_tokens=SUMMARY_TOKEN_BUDGET // 4,
+                              max_value_chars=40):
+    """
+    Propiedades de las columnas más relevantes para el contexto que quedaron fuera
+    del resumen ya serializado (summary_text, ver serialize_summary) o que se
+    recortaron en él, en JSON compacto y dentro de max_tokens. Devuelve "" si no
+    falta ninguna.
+    """
+    if isinstance(summary, str) or not context:
+        return ""
+    serialized = {field["column"]: field for field in json.loads(summary_text).get("fields", [])}
+    fields = summary.get("fields") or []
+    properties = SUMMARY_STAGE_FIELDS.get(stage, SUMMARY_STAGE_FIELDS["goal"])
+
+    relevant = []
+    for index in rank_columns(fields, context, only_relevant=True):
+        field = _compact_field(fields[index], properties, 1, max_value_chars)
+        if set(field) <= set(serialized.get(field["column"], {})):
+            continue
+        candidate = relevant + [field]
+        if estimate_tokens(json.dumps(candidate, ensure_ascii=False, separators=(",", ":"), default=str)) > max_tokens:
+            break
+        relevant = candidate
+    if not relevant:
+        return ""
+    return json.dumps(relevant, ensure_ascii=False, separators=(",", ":"), default=str)
+
+
+def build_viz_messages(summary, task_prompt, config=None, context=None, lib="seaborn", lang="spanish"):
+    """
+    Mensajes para el generador, el editor y el reparador con un prefijo estable:
+    el sistema (rol común y resumen del dataset) no depende del objetivo ni del
+    código, así que es idéntico en todas las llamadas del mismo dataset y el
+    servidor reutiliza su prefill. Lo propio de la llamada va después, en el
+    mensaje del usuario: si el resumen no cabe entero, el detalle de las columnas
+    relevantes para el contexto y a continuación la tarea.
+    """
+    summary_text = serialize_summary(summary, stage="viz", max_tokens=get_summary_token_budget(config))
+    relevant_fields = serialize_relevant_fields(summary, summary_text, context,
+                                                max_tokens=get_summary_token_budget(config) // 4)
+    return [
+        {"role": "system", "content": get_viz_sys_prompt(summary_text, lib=lib, lang=lang)},
+        {"role": "user", "content": get_relevant_fields_prompt(relevant_fields) + task_prompt},
+    ]
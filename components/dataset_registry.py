@@ -0,0 +1,121 @@
+import threading
+import weakref
+from collections import OrderedDict
+from dataclasses import dataclass
+
+import pandas as pd
+
+from .shared_data import get_shared_store, set_dataset_fingerprint
+
+
+@dataclass
+class _RegistryEntry:
+    df: pd.DataFrame
+    nbytes: int
+    refs: int = 0
+
+
+class DatasetRegistry():
+    """
+    Registro de DataFrames compartido por todas las sesiones del proceso.
+    Cada dataset se carga una sola vez por clave (huella) y las sesiones reciben
+    referencias de solo lectura: copias superficiales que comparten los datos (con
+    copy-on-write activado las escrituras nunca llegan al DataFrame compartido).
+    Las referencias vivas se cuentan y, si se supera max_bytes, se desalojan los
+    datasets sin referencias usados hace más tiempo (LRU).
+    """
+
+    def __init__(self, max_bytes=2 * 1024 ** 3):
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        # RLock: las referencias se liberan desde weakref.finalize, que puede
+        # ejecutarse en cualquier punto (incluso con el lock ya tomado)
+        self._lock = threading.RLock()
+
+    def acquire(self, key, loader=None):
+        """
+        Devuelve una referencia al dataset de la clave, cargándolo con loader() si
+        no está registrado (None si no está y no hay loader). La referencia se
+        libera sola cuando deja de usarse.
+        """
+        # La referencia se toma en la misma sección crítica que la búsqueda o el
+        # alta: entre ambas _evict podría retirar la entrada y quedaría huérfana
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                entry.refs += 1
+
+        if entry is None:
+            if loader is None:
+                return None
+            df = loader()
+            with self._lock:
+                entry = self._entries.get(key)
+                if entry is None:
+                    entry = _RegistryEntry(df=df, nbytes=int(df.memory_usage(deep=True).sum()))
+                    self._entries[key] = entry
+                    self.misses += 1
+                entry.refs += 1
+
+        try:
+            view = entry.df.copy(deep=False)
+            set_dataset_fingerprint(view, key)
+        except BaseException:
+            self._release(entry)
+            raise
+        # Se libera la entrada concreta (no la clave): si se retira y se vuelve a
+        # cargar, la referencia no descuenta de la entrada nueva
+        weakref.finalize(view, self._release, entry)
+        with self._lock:
+            self._evict()
+        return view
+
+    def _release(self, entry):
+        with self._lock:
+            entry.refs -= 1
+            self._evict()
+
+    def _evict(self):
+        total = sum(entry.nbytes for entry in self._entries.values())
+        for key in list(self._entries):
+            if total <= self.max_bytes:
+                break
+            entry = self._entries[key]
+            if entry.refs > 0:
+                continue
+            del self._entries[key]
+            total -= entry.nbytes
+            # También se retira la copia publicada para los procesos de ejecución
+            get_shared_store().release(key)
+
+    def __contains__(self, key):
+        with self._lock:
+            return key in self._entries
+
+    def stats(self):
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "datasets": len(self._entries),
+                "references": sum(entry.refs for entry in self._entries.values()),
+                "bytes": sum(entry.nbytes for entry in self._entries.values()),
+                "max_bytes": self.max_bytes,
+            }
+
+
+_registry = None
+_registry_lock = threading.Lock()
+
+
+def get_dataset_registry():
+    """Devuelve el registro de datasets compartido por todo el proceso"""
+    global _registry
+    with _registry_lock:
+        if _registry is None:
+            _registry = DatasetRegistry()
+        return _registry
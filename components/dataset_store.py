@@ -0,0 +1,151 @@
+import hashlib
+import json
+import os
+import pickle
+import threading
+import time
+
+from . import utils
+from .dataset_registry import get_dataset_registry
+from .fileio import atomic_write
+from .shared_data import get_shared_store
+from .summary_cache import indexed_content_hash
+
+
+class DatasetStore():
+    """
+    Copia columnar de los datasets en disco (ingesta única).
+    Cada fichero de origen se lee y limpia una sola vez y se guarda como Feather
+    sin comprimir (Arrow IPC), que se lee mapeado en memoria. Junto a los datos se
+    guardan sus metadatos (origen, filas, columnas y tipos) y los resúmenes base
+    calculados por el Summarizer.
+    La clave es el hash del contenido del fichero de origen y su codificación.
+    """
+
+    def __init__(self, store_dir=".cache/datasets"):
+        self.store_dir = store_dir
+        self.index_dir = os.path.join(store_dir, "index")
+        os.makedirs(self.index_dir, exist_ok=True)
+        self._lock = threading.Lock()
+
+    def _key(self, file_location, encoding):
+        content_hash = indexed_content_hash(file_location, self.index_dir)
+        return hashlib.sha256(f"{content_hash}|{encoding}".encode("utf-8")).hexdigest()[:32]
+
+    def _path(self, key, suffix):
+        return os.path.join(self.store_dir, f"{key}{suffix}")
+
+    def ingest(self, file_location, encoding="utf-8"):
+        """
+        Guarda la copia columnar del fichero si aún no existe.
+        Devuelve la clave del dataset, o None si no se puede representar en Arrow.
+        """
+        import pyarrow as pa
+
+        key = self._key(file_location, encoding)
+        data_path = self._path(key, ".feather")
+        metadata_path = self._path(key, ".json")
+        with self._lock:
+            if os.path.exists(data_path) and os.path.exists(metadata_path):
+                return key
+
+            df = utils.read_dataframe(file_location, encoding=encoding)
+            tmp_path = f"{data_path}.{os.getpid()}.tmp"
+            try:
+                table = pa.Table.from_pandas(df, preserve_index=False)
+                with pa.OSFile(tmp_path, "wb") as sink:
+                    with pa.ipc.new_file(sink, table.schema) as writer:
+                        writer.write_table(table)
+                os.replace(tmp_path, data_path)
+            except (pa.ArrowException, TypeError, ValueError) as e:
+                print(f"No se pudo guardar la copia columnar de {file_location}: {e}")
+                if os.path.exists(tmp_path):
+                    os.remove(tmp_path)
+                return None
+
+            metadata = {
+                "source": os.path.abspath(file_location),
+                "encoding": encoding,
+                "format": "feather",
+                "rows": len(df),
+                "columns": [{"name": str(column), "dtype": str(dtype)} for column, dtype in df.dtypes.items()],
+                "ingested_at": time.time(),
+            }
+            atomic_write(metadata_path, json.dumps(metadata, ensure_ascii=False, indent=2).encode("utf-8"))
+            return key
+
+    def get_metadata(self, file_location, encoding="utf-8"):
+        """Metadatos de la copia columnar, o None si el fichero no se ha ingerido"""
+        metadata_path = self._path(self._key(file_location, encoding), ".json")
+        if not os.path.exists(metadata_path):
+            return None
+        with open(metadata_path, "r") as file:
+            return json.load(file)
+
+    def load(self, file_location, encoding="utf-8", usecols=None, compact=False):
+        """
+        Lee el dataset desde la copia columnar (ingiriéndolo la primera vez).
+        El dataset completo se sirve desde el registro de datasets del proceso (una
+        sola copia en memoria para todas las sesiones) y su fichero se registra para
+        que los procesos del ChartExecutor lo mapeen sin volver a escribirlo.
+        compact => reducir la memoria del DataFrame (ver utils.compact_dataframe)
+        """
+        import pyarrow as pa
+
+        key = self.ingest(file_location, encoding)
+        if key is None:
+            return utils.read_dataframe(file_location, encoding=encoding, usecols=usecols, compact=compact)
+
+        data_path = self._path(key, ".feather")
+
+        def read_columns():
+            table = pa.ipc.open_file(pa.memory_map(data_path, "r")).read_all()
+            if usecols is not None:
+                table = table.select([column for column in table.column_names if column in usecols])
+            df = table.to_pandas()
+            if compact:
+                df, report = utils.compact_dataframe(df)
+                df.attrs["compaction"] = report
+            return df
+
+        if usecols is not None:
+            return read_columns()
+
+        if compact:
+            # Los tipos compactados no coinciden con la copia en disco: se publica aparte
+            return get_dataset_registry().acquire(f"{key}-compact", read_columns)
+
+        df = get_dataset_registry().acquire(key, read_columns)
+        get_shared_store().register(df, key, os.path.abspath(data_path))
+        return df
+
+    def _summaries(self, key):
+        summaries_path = self._path(key, ".summaries.pkl")
+        if not os.path.exists(summaries_path):
+            return {}
+        with open(summaries_path, "rb") as file:
+            return pickle.load(file)
+
+    def get_summary(self, file_location, encoding, n_samples, compact=False):
+        """Propiedades de columnas guardadas para el dataset, o None"""
+        return self._summaries(self._key(file_location, encoding)).get((n_samples, compact))
+
+    def set_summary(self, file_location, encoding, n_samples, properties_list, compact=False):
+        key = self._key(file_location, encoding)
+        with self._lock:
+            summaries = self._summaries(key)
+            summaries[(n_samples, compact)] = properties_list
+            atomic_write(self._path(key, ".summaries.pkl"), pickle.dumps(summaries))
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_dataset_store():
+    """Devuelve el almacén de datasets compartido por todo el proceso"""
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = DatasetStore()
+        return _store
@@ -0,0 +1,148 @@
+import ast
+import builtins
+import importlib
+import threading
+
+
+# Módulos que el código generado puede importar. Se importan una sola vez al
+# precalentar el espacio de nombres; cualquier otro import se rechaza.
+ALLOWED_MODULES = (
+    "pandas",
+    "pandas.api.types",
+    "numpy",
+    "matplotlib",
+    "matplotlib.pyplot",
+    "matplotlib.cm",
+    "matplotlib.colors",
+    "matplotlib.dates",
+    "matplotlib.patches",
+    "matplotlib.ticker",
+    "seaborn",
+    "calendar",
+    "collections",
+    "datetime",
+    "functools",
+    "itertools",
+    "math",
+    "re",
+    "statistics",
+    "textwrap",
+    "typing",
+    "warnings",
+)
+
+# Nombres disponibles sin import en el código generado
+DEFAULT_ALIASES = {
+    "pd": "pandas",
+    "np": "numpy",
+    "plt": "matplotlib.pyplot",
+    "sns": "seaborn",
+}
+
+
+class ForbiddenImportError(ImportError):
+    """El código generado intenta importar un módulo fuera de la lista permitida"""
+
+
+def imported_modules(code):
+    """
+    Módulos importados en el código (en cualquier nivel, también dentro de funciones).
+    Lanza SyntaxError si el código no es válido.
+    """
+    modules = []
+    for node in ast.walk(ast.parse(code)):
+        if isinstance(node, ast.Import):
+            modules.extend(alias.name for alias in node.names)
+        elif isinstance(node, ast.ImportFrom):
+            if node.level:
+                modules.append("." * node.level + (node.module or ""))
+            else:
+                modules.append(node.module)
+    return modules
+
+
+class ExecutionNamespace():
+    """
+    Espacio de nombres precalentado para ejecutar el código generado.
+    Los módulos permitidos se importan una sola vez y cada ejecución recibe una
+    copia superficial del espacio base, así que ejecutar no vuelve a importar nada.
+    Los imports fuera de la lista se rechazan antes de ejecutar (check_imports) y
+    también durante la ejecución, con un __import__ restringido en los builtins.
+    """
+
+    def __init__(self, allowed_modules=ALLOWED_MODULES, aliases=None):
+        self.allowed_modules = frozenset(allowed_modules)
+        self.aliases = DEFAULT_ALIASES if aliases is None else aliases
+        self._base = None
+        self._lock = threading.Lock()
+
+    def warm(self):
+        """Importa los módulos permitidos y construye el espacio base (solo la primera vez)"""
+        with self._lock:
+            if self._base is not None:
+                return self._base
+            modules = {}
+            for name in sorted(self.allowed_modules):
+                try:
+                    modules[name] = importlib.import_module(name)
+                except ImportError as e:
+                    print(f"No se pudo precargar el módulo {name}: {e}")
+
+            safe_builtins = dict(vars(builtins))
+            safe_builtins["__import__"] = self._guarded_import
+            base = {"__builtins__": safe_builtins}
+            for alias, name in self.aliases.items():
+                if name in modules:
+                    base[alias] = modules[name]
+            self._base = base
+            return base
+
+    def is_allowed(self, module_name):
+        return module_name in self.allowed_modules
+
+    def check_imports(self, code):
+        """Lanza ForbiddenImportError si el código importa algún módulo no permitido"""
+        forbidden = [name for name in imported_modules(code) if not self.is_allowed(name)]
+        if forbidden:
+            raise ForbiddenImportError(
+                f"Import no permitido: {', '.join(sorted(set(forbidden)))}. "
+                f"Módulos permitidos: {', '.join(sorted(self.allowed_modules))}"
+            )
+
+    def _guarded_import(self, name, globals=None, locals=None, fromlist=(), level=0):
+        if level or not self.is_allowed(name):
+            raise ForbiddenImportError(f"Import no permitido: {name}")
+        return builtins.__import__(name, globals, locals, fromlist, level)
+
+    def for_run(self, data):
+        """
+        Copia superficial del espacio base con el dataset de esta ejecución.
+        El código recibe su propia copia del dataset: lo que modifique no llega al
+        DataFrame de la sesión ni deja obsoleta su huella (dataset_fingerprint)
+        """
+        namespace = dict(self.warm())
+        namespace["data"] = _run_copy(data)
+        return namespace
+
+
+def _run_copy(data):
+    import pandas as pd
+
+    if not isinstance(data, (pd.DataFrame, pd.Series)):
+        return data
+    # Con copy-on-write basta una copia superficial (las escrituras copian antes los
+    # datos); sin él, las escrituras en la copia superficial llegarían al original
+    return data.copy(deep=pd.get_option("mode.copy_on_write") is not True)
+
+
+_namespace = None
+_namespace_lock = threading.Lock()
+
+
+def get_execution_namespace():
+    """Devuelve el espacio de nombres de ejecución compartido por todo el proceso"""
+    global _namespace
+    with _namespace_lock:
+        if _namespace is None:
+            _namespace = ExecutionNamespace()
+        return _namespace
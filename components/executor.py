@@ -1,19 +1,21 @@
 import ast
 import base64
-import importlib
+import difflib
 import io
 import os
 import re
 import traceback
-import matplotlib
-matplotlib.use('Agg')
-import matplotlib.pyplot as plt
-from matplotlib.backends.backend_agg import FigureCanvasAgg
 import pandas as pd
 import copy
 import threading
 import queue
+from concurrent.futures import ThreadPoolExecutor
 
+from .chart_cache import ChartCache, get_chart_cache
+from .executor_pool import ChartExecutionError, ChartTimeoutError, get_worker_pool
+from .execution_namespace import get_execution_namespace
+from .dataset_registry import get_dataset_registry
+from .shared_data import dataset_fingerprint, get_shared_store
 from dataclasses import field
 from typing import Any, Dict, List, Optional, Union
 from pydantic.dataclasses import dataclass
@@ -27,15 +29,18 @@ class ChartExecutorResponse:
     goal_rationale: Optional[str]
     spec: Optional[Union[str, Dict]]
     status: bool
-    raster: Optional[str]
+    raster: Optional[bytes]
     code: str
     library: str
     error: Optional[Dict] = None
+    format: str = "png"
 
     def _repr_mimebundle_(self, include=None, exclude=None):
         bundle = {"text/plain": self.code}
-        if self.raster is not None:
-            bundle["image/png"] = self.raster
+        if self.raster is not None and self.format == "png":
+            bundle["image/png"] = base64.b64encode(self.raster).decode("ascii")
+        elif self.raster is not None and self.format == "svg":
+            bundle["image/svg+xml"] = self.raster.decode("utf-8")
         if self.spec is not None:
             bundle["application/vnd.vegalite.v5+json"] = self.spec
         return bundle
@@ -43,10 +48,34 @@ class ChartExecutorResponse:
     def savefig(self, path):
         if self.raster:
             with open(path, 'wb') as f:
-                f.write(base64.b64decode(self.raster))
+                f.write(self.raster)
         else:
             raise FileNotFoundError("No raster image to save")
 
+
+@dataclass
+class RenderOptions:
+    """
+    Opciones de la imagen generada.
+    format => png, webp o svg
+    max_pixels => límite de píxeles (ancho x alto) de la imagen; si se supera se reduce el dpi
+    """
+    dpi: int = 300
+    format: str = "png"
+    max_pixels: Optional[int] = None
+
+    def __post_init__(self):
+        if self.format not in ["png", "webp", "svg"]:
+            raise ValueError(f"Unsupported format. Supported formats are png, webp, svg. You provided {self.format}")
+
+    def as_dict(self):
+        return {"dpi": self.dpi, "format": self.format, "max_pixels": self.max_pixels}
+
+
+# Vista previa rápida en la interfaz y render en alta resolución solo al exportar
+PREVIEW_RENDER_OPTIONS = RenderOptions(dpi=100, format="png", max_pixels=2_000_000)
+EXPORT_RENDER_OPTIONS = RenderOptions(dpi=300, format="png")
+
 def preprocess_code(code):
     code = code.replace("<imports>", "").replace("<stub>", "").replace("<transforms>", "").replace("python", "")
     if "chart = plot(data)" in code:
@@ -67,110 +96,339 @@ def preprocess_code(code):
         code = code + "\nchart = plot(data)"
     return code
 
-def get_globals_dict(code_string, data):
-    tree = ast.parse(code_string)
-    imported_modules = []
-    for node in tree.body:
-        if isinstance(node, ast.Import):
-            for alias in node.names:
-                module = importlib.import_module(alias.name)
-                imported_modules.append((alias.name, alias.asname, module))
-        elif isinstance(node, ast.ImportFrom):
-            module = importlib.import_module(node.module)
-            for alias in node.names:
-                obj = getattr(module, alias.name)
-                imported_modules.append((f"{node.module}.{alias.name}", alias.asname, obj))
-    globals_dict = {}
-    for module_name, alias, obj in imported_modules:
-        if alias:
-            globals_dict[alias] = obj
+# Llamadas que leen o escriben ficheros, acceden a la red o intentan mostrar la figura
+FORBIDDEN_FUNCTIONS = {"open", "input", "breakpoint", "exec", "eval", "compile"}
+FORBIDDEN_METHODS = {
+    "read_csv", "read_table", "read_excel", "read_json", "read_parquet", "read_feather", "read_pickle",
+    "read_html", "read_xml", "read_sql", "read_sql_query", "read_sql_table", "read_clipboard",
+    "to_csv", "to_excel", "to_json", "to_parquet", "to_feather", "to_pickle", "to_sql", "to_clipboard",
+    "savefig", "show",
+}
+# Parámetros de seaborn que nombran columnas de data
+COLUMN_KEYWORDS = {"x", "y", "hue", "size", "style", "col", "row", "weights", "units"}
+# Columnas que pandas crea con nombre por defecto (melt, reset_index, stack...)
+IMPLICIT_COLUMNS = {"index", "level_0", "value", "variable"}
+
+
+def _diagnostic(severity, check, message, node=None):
+    return {"severity": severity, "check": check, "message": message,
+            "line": getattr(node, "lineno", None)}
+
+
+def _format_diagnostics(diagnostics):
+    return "\n".join(
+        f"Línea {diagnostic['line']}: {diagnostic['message']}" if diagnostic["line"] else diagnostic["message"]
+        for diagnostic in diagnostics
+    )
+
+
+def _column_diagnostics(tree, columns, data_names):
+    """
+    Columnas de data que no existen en el resumen ni se crean en el código.
+    Son avisos, no errores: el código puede crear columnas que el análisis
+    estático no ve, así que se ejecuta igualmente y el aviso acompaña al error
+    si la ejecución falla (y llega así al reparador)
+    """
+    checked = []
+    checked_nodes = set()
+    for node in ast.walk(tree):
+        if (isinstance(node, ast.Subscript) and isinstance(node.ctx, ast.Load)
+                and isinstance(node.value, ast.Name) and node.value.id in data_names):
+            keys = node.slice.elts if isinstance(node.slice, (ast.List, ast.Tuple)) else [node.slice]
+            for key in keys:
+                if isinstance(key, ast.Constant) and isinstance(key.value, str):
+                    checked.append(key)
+                    checked_nodes.add(id(key))
+        elif isinstance(node, ast.Call) and any(
+                keyword.arg == "data" and isinstance(keyword.value, ast.Name) and keyword.value.id in data_names
+                for keyword in node.keywords):
+            for keyword in node.keywords:
+                if (keyword.arg in COLUMN_KEYWORDS and isinstance(keyword.value, ast.Constant)
+                        and isinstance(keyword.value.value, str)):
+                    checked.append(keyword.value)
+                    checked_nodes.add(id(keyword.value))
+
+    # Cualquier otro texto o argumento con nombre puede crear una columna nueva
+    # (data['nueva'] = ..., rename, reset_index(name=...), agg(total=...)), así que
+    # solo se señalan los nombres que el código nunca menciona de otra forma
+    created = set()
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Constant) and isinstance(node.value, str) and id(node) not in checked_nodes:
+            created.add(node.value)
+        elif isinstance(node, ast.keyword) and node.arg:
+            created.add(node.arg)
+
+    diagnostics = []
+    known = set(columns) | created | IMPLICIT_COLUMNS
+    for node in checked:
+        if node.value not in known:
+            message = f"La columna '{node.value}' no existe en el dataset"
+            suggestions = difflib.get_close_matches(node.value, columns, n=1)
+            if suggestions:
+                message += f" (¿quizá '{suggestions[0]}'?)"
+            diagnostics.append(_diagnostic("warning", "unknown_column", message, node))
+    return diagnostics
+
+
+def validate_code(code, summary=None):
+    """
+    Análisis estático del código ya preprocesado, sin ejecutarlo.
+    Devuelve una lista de diagnósticos {severity, check, message, line}:
+    errores (error) que harían fallar o no se permiten ejecutar y avisos (warning)
+    sobre patrones lentos. Con el resumen se comprueban también las columnas usadas.
+    """
+    try:
+        tree = ast.parse(code)
+    except SyntaxError as e:
+        return [_diagnostic("error", "syntax", f"Error de sintaxis: {e.msg}", e)]
+
+    diagnostics = []
+    plot_functions = [node for node in tree.body if isinstance(node, ast.FunctionDef) and node.name == "plot"]
+    if not plot_functions:
+        diagnostics.append(_diagnostic("error", "missing_plot", "El código no define la función plot(data)"))
+
+    namespace = get_execution_namespace()
+    for node in ast.walk(tree):
+        if isinstance(node, (ast.Import, ast.ImportFrom)):
+            if isinstance(node, ast.Import):
+                names = [alias.name for alias in node.names]
+            else:
+                names = ["." * node.level + (node.module or "")]
+            for name in names:
+                if not namespace.is_allowed(name):
+                    diagnostics.append(_diagnostic("error", "forbidden_import", f"Import no permitido: {name}", node))
+
+        elif isinstance(node, ast.Call):
+            function = node.func
+            if isinstance(function, ast.Name) and function.id in FORBIDDEN_FUNCTIONS:
+                diagnostics.append(_diagnostic("error", "forbidden_call", f"Llamada no permitida: {function.id}()", node))
+            elif isinstance(function, ast.Attribute) and function.attr in FORBIDDEN_METHODS:
+                diagnostics.append(_diagnostic("error", "forbidden_call", f"Llamada no permitida: .{function.attr}()", node))
+
+        elif isinstance(node, ast.For):
+            iterator = node.iter
+            if (isinstance(iterator, ast.Call) and isinstance(iterator.func, ast.Attribute)
+                    and iterator.func.attr in ["iterrows", "itertuples"]):
+                diagnostics.append(_diagnostic(
+                    "warning", "slow_loop",
+                    f"Bucle fila a fila con {iterator.func.attr}(), usa operaciones vectorizadas", node))
+            elif (isinstance(iterator, ast.Call) and isinstance(iterator.func, ast.Name) and iterator.func.id == "range"
+                  and any(isinstance(arg, ast.Call) and isinstance(arg.func, ast.Name) and arg.func.id == "len"
+                          for arg in iterator.args)):
+                diagnostics.append(_diagnostic(
+                    "warning", "slow_loop", "Bucle por índice sobre range(len(...)), usa operaciones vectorizadas", node))
+
+    if isinstance(summary, dict) and summary.get("fields"):
+        columns = [field["column"] for field in summary["fields"]]
+        data_names = {"data"}
+        for function in plot_functions:
+            data_names.update(arg.arg for arg in function.args.args[:1])
+        diagnostics += _column_diagnostics(tree, columns, data_names)
+
+    return sorted(diagnostics, key=lambda diagnostic: diagnostic["line"] or 0)
+
+
+def render_chart(code, data, render_options=None):
+    """
+    Ejecuta el código de un gráfico sobre data y devuelve la imagen en bytes
+    (por defecto PNG a 300 dpi, ver RenderOptions).
+    Cada render dibuja en su propia figura (ver figure_scope), así que se puede
+    usar a la vez desde varios hilos y en los procesos trabajadores del pool.
+    """
+    # matplotlib solo se importa al renderizar: con el backend de procesos el
+    # proceso de la interfaz no llega a cargarlo
+    from .figure_scope import figure_scope
+    import matplotlib.pyplot as plt
+    from matplotlib.axes import Axes
+    from matplotlib.figure import Figure
+
+    render_options = render_options or EXPORT_RENDER_OPTIONS
+    with figure_scope():
+        namespace = get_execution_namespace()
+        namespace.check_imports(code)
+        ex_locals = namespace.for_run(data)
+        exec(code, ex_locals)
+        if "chart" not in ex_locals:
+            raise ValueError("El código no definió la variable 'chart'")
+
+        chart = ex_locals["chart"]
+        if isinstance(chart, Figure):
+            figure = chart
+        elif isinstance(chart, Axes):
+            figure = chart.get_figure()
         else:
-            globals_dict[module_name.split(".")[-1]] = obj
-    ex_dicts = {"pd": pd, "data": data, "plt": plt}
-    globals_dict.update(ex_dicts)
-    return globals_dict
+            figure = plt.gcf()
+
+        buf = io.BytesIO()
+        ax = figure.gca()
+        ax.set_frame_on(False)
+        ax.grid(color="lightgray", linestyle="dashed", zorder=-10)
+        dpi = render_options.dpi
+        if render_options.max_pixels:
+            width, height = figure.get_size_inches()
+            dpi = min(dpi, (render_options.max_pixels / (width * height)) ** 0.5)
+        figure.savefig(buf, format=render_options.format, dpi=dpi, bbox_inches='tight')
+        return buf.getvalue()
+
+
+def _make_response(goal, code, library, status, raster=None, error=None, format="png"):
+    """Respuesta de la ejecución del código de un objetivo"""
+    return ChartExecutorResponse(
+        index=goal["index"],
+        goal_question=goal["question"],
+        goal_visualization=goal["visualization"],
+        goal_rationale=goal["rationale"],
+        spec=None,
+        status=status,
+        raster=raster,
+        code=code,
+        library=library,
+        error=error,
+        format=format,
+    )
+
 
 class ChartExecutor:
-    def __init__(self) -> None:
-        pass
+    def __init__(self, backend="process", use_cache=True) -> None:
+        """
+        backend => process, ejecuta en el pool de procesos precalentados (timeout real)
+        backend => thread, ejecuta en un hilo del proceso actual
+        use_cache => reutilizar la imagen si ya se ejecutó el mismo código sobre el mismo dataset
+        """
+        if backend not in ["process", "thread"]:
+            raise ValueError(f"Unsupported backend. Supported backends are process, thread. You provided {backend}")
+        self.backend = backend
+        self.use_cache = use_cache
+        if backend == "thread":
+            # En el backend de procesos los trabajadores precalientan su propio espacio
+            from .figure_scope import install_thread_local_pyplot
+            install_thread_local_pyplot()
+            get_execution_namespace().warm()
 
-    def _run_execution(self, code, ex_locals, data, library, goal, queue_result):
+    def _run_execution(self, code, data, library, goal, queue_result, render_options):
         """Ejecuta el código y guarda el resultado en una cola"""
         try:
             print("Paso 4: Ejecutando código")
-            exec(code, ex_locals)
-            print("Paso 5: Código ejecutado")
-            
-            print("Paso 6: Verificando 'chart'")
-            if "chart" not in ex_locals:
-                raise ValueError("El código no definió la variable 'chart'")
-            chart = ex_locals["chart"]
-            
-            # print("Paso 7: Generando imagen")
-            
-            # print("Paso 7.2: Configurando figura")
-            # fig = chart
-            # if not fig.get_axes():
-            #     raise ValueError("No hay ejes en la figura para renderizar")
-            
-            # fig.gca().set_frame_on(False)
-            # fig.gca().grid(color="lightgray", linestyle="dashed", zorder=-10)
-            # fig.tight_layout()
-            
-            # print("Paso 7.3: Renderizando imagen")
-            # canvas = FigureCanvasAgg(fig)
-            # buf = io.BytesIO()
-            # canvas.print_png(buf)
-            # print("Paso 8: Imagen guardada en buffer")
-            # buf.seek(0)
-            # plot_data = base64.b64encode(buf.read()).decode("ascii")
-            # print("Paso 9: Imagen codificada en base64")
-
-            print("Paso 7: Generando imagen")
-            buf = io.BytesIO()
-            plt.gca().set_frame_on(False)
-            plt.grid(color="lightgray", linestyle="dashed", zorder=-10)
-            plt.savefig(buf, format="png", dpi=300, bbox_inches='tight')
-            print("Paso 8: Imagen guardada en buffer")
-            buf.seek(0)
-            plot_data = base64.b64encode(buf.read()).decode("ascii")
-            print("Paso 9: Imagen codificada en base64")
-            
-            result = ChartExecutorResponse(
-                index=goal["index"],
-                goal_question=goal["question"],
-                goal_visualization=goal["visualization"],
-                goal_rationale=goal["rationale"],
-                spec=None,
-                status=True,
-                raster=plot_data,
-                code=code,
-                library=library,
-            )
+            plot_data = render_chart(code, data, render_options)
+            print("Paso 5: Imagen generada")
+            result = _make_response(goal, code, library, True, raster=plot_data, format=render_options.format)
         except Exception as exception_error:
             print(f"Error en ejecución:\n{str(exception_error)}")
             print(f"Traceback:\n{traceback.format_exc()}")
-            result = ChartExecutorResponse(
-                index=goal["index"],
-                goal_question=goal["question"],
-                goal_visualization=goal["visualization"],
-                goal_rationale=goal["rationale"],
-                spec=None,
-                status=False,
-                raster=None,
-                code=code,
-                library=library,
+            result = _make_response(
+                goal, code, library, False,
                 error={
                     "message": str(exception_error),
                     "traceback": traceback.format_exc(),
                 },
             )
-        finally:
-            plt.close('all')
-            print("Paso 10: Estado limpiado")
-        
+
         queue_result.put(result)
 
+    def _execute_in_thread(self, code, data, library, goal, timeout_seconds, render_options):
+        queue_result = queue.Queue()
+        thread = threading.Thread(
+            target=self._run_execution,
+            args=(code, data, library, goal, queue_result, render_options)
+        )
+        thread.start()
+        thread.join(timeout=timeout_seconds)
+
+        if thread.is_alive():
+            # No podemos matar el hilo directamente en Python, pero marcamos el timeout
+            raise ChartTimeoutError(f"Timeout: La ejecución excedió {timeout_seconds} segundos")
+        return queue_result.get_nowait()
+
+    def _execute_in_process(self, code, data, library, goal, timeout_seconds, render_options):
+        try:
+            plot_data = get_worker_pool().run(code, data, timeout_seconds=timeout_seconds,
+                                              render_options=render_options)
+        except ChartExecutionError as exception_error:
+            print(f"Error en ejecución:\n{exception_error.message}")
+            return _make_response(
+                goal, code, library, False,
+                error={
+                    "message": exception_error.message,
+                    "traceback": exception_error.traceback,
+                },
+            )
+
+        return _make_response(goal, code, library, True, raster=plot_data, format=render_options.format)
+
+    def _execute_goal(self, goal, data, library, return_error, timeout_seconds, fingerprint=None,
+                      render_options=EXPORT_RENDER_OPTIONS, summary=None):
+        """Ejecuta el código de un objetivo y devuelve su respuesta (o None)"""
+        code = preprocess_code(goal["code"])
+        print(f"Paso 1: Código preprocesado:\n{code}")
+
+        cache_key = None
+        if self.use_cache and fingerprint is not None:
+            cache_key = ChartCache.make_key(code, fingerprint, library, render_options.as_dict())
+            plot_data = get_chart_cache().get(cache_key)
+            if plot_data is not None:
+                print("Paso 2: Gráfico recuperado de la caché")
+                return _make_response(goal, code, library, True, raster=plot_data, format=render_options.format)
+
+        diagnostics = validate_code(code, summary)
+        for diagnostic in diagnostics:
+            print(f"Validación ({diagnostic['severity']}, línea {diagnostic['line']}): {diagnostic['message']}")
+        errors = [diagnostic for diagnostic in diagnostics if diagnostic["severity"] == "error"]
+        if errors:
+            # Los errores detectados sin ejecutar se devuelven sin llegar a ejecutar el código
+            return _make_response(
+                goal, code, library, False,
+                error={
+                    "message": _format_diagnostics(errors),
+                    "traceback": "",
+                    "diagnostics": diagnostics,
+                },
+            )
+
+        try:
+            print(f"Paso 2: Ejecutando con backend '{self.backend}'")
+            if self.backend == "process":
+                result = self._execute_in_process(code, data, library, goal, timeout_seconds, render_options)
+            else:
+                result = self._execute_in_thread(code, data, library, goal, timeout_seconds, render_options)
+
+        except ChartTimeoutError as timeout_error:
+            print(str(timeout_error))
+            result = _make_response(
+                goal, code, library, False,
+                error={
+                    "message": str(timeout_error),
+                    "traceback": "",
+                },
+            )
+
+        except Exception as exception_error:
+            print(f"Error inesperado:\n{str(exception_error)}")
+            print(f"Traceback:\n{traceback.format_exc()}")
+            if not return_error:
+                return None
+            result = _make_response(
+                goal, code, library, False,
+                error={
+                    "message": str(exception_error),
+                    "traceback": traceback.format_exc(),
+                },
+            )
+
+        warnings = [diagnostic for diagnostic in diagnostics if diagnostic["severity"] == "warning"]
+        if not result.status and warnings:
+            # Los avisos de validación (p. ej. columnas desconocidas) acompañan al error para el reparador
+            result.error["message"] += "\nAvisos de validación:\n" + _format_diagnostics(warnings)
+            result.error["diagnostics"] = diagnostics
+
+        # Solo se guardan los gráficos correctos: los errores y timeouts se reintentan.
+        # Un fallo al guardar (disco lleno, permisos) no convierte el gráfico en un error
+        if cache_key is not None and result.status:
+            try:
+                get_chart_cache().set(cache_key, result.raster)
+            except OSError as e:
+                print(f"No se pudo guardar el gráfico en la caché: {e}")
+        return result
+
     def execute(
         self,
         data,
@@ -179,8 +437,22 @@ class ChartExecutor:
         library="seaborn",
         return_error=True,
         timeout_seconds=10,
+        max_concurrency=1,
+        render_options=None,
     ):
-        charts = []
+        """
+        Ejecuta el código de cada objetivo y devuelve los gráficos en el orden de los objetivos.
+        max_concurrency => número máximo de objetivos ejecutándose a la vez.
+        El timeout de cada objetivo es independiente y empieza cuando obtiene un trabajador.
+        render_options => formato, dpi y tamaño máximo de la imagen (por defecto
+                          EXPORT_RENDER_OPTIONS, PNG a 300 dpi). La imagen se devuelve en
+                          bytes en ChartExecutorResponse.raster.
+        Antes de ejecutar, el código se valida con validate_code (columnas del resumen,
+        imports y llamadas no permitidas): si hay errores no se ejecuta y sus
+        diagnósticos se devuelven en error["diagnostics"]. Los avisos (p. ej. columnas
+        que no están en el resumen) no impiden la ejecución; si falla, se añaden al error.
+        """
+        render_options = render_options or EXPORT_RENDER_OPTIONS
         goals_with_code = copy.deepcopy(in_goals_with_code)
         
         if library not in ["matplotlib", "seaborn"]:
@@ -188,74 +460,37 @@ class ChartExecutor:
                 f"Unsupported library. Supported libraries are seaborn, matplotlib. You provided {library}"
             )
 
-        for goal in goals_with_code["goals"]:
-            code = preprocess_code(goal["code"])
-            print(f"Paso 1: Código preprocesado:\n{code}")
-            
-            try:
-                print("Paso 2: Limpiando estado de matplotlib")
-                plt.clf()
-                plt.close('all')
-                
-                print("Paso 3: Preparando globals")
-                ex_locals = get_globals_dict(code, data)
-                
-                queue_result = queue.Queue()
-                thread = threading.Thread(
-                    target=self._run_execution,
-                    args=(code, ex_locals, data, library, goal, queue_result)
-                )
-                thread.start()
-                thread.join(timeout=timeout_seconds)
-                
-                if thread.is_alive():
-                    print(f"Timeout: La ejecución excedió {timeout_seconds} segundos")
-                    # No podemos matar el hilo directamente en Python, pero marcamos el timeout
-                    charts.append(
-                        ChartExecutorResponse(
-                            index=goal["index"],
-                            goal_question=goal["question"],
-                            goal_visualization=goal["visualization"],
-                            goal_rationale=goal["rationale"],
-                            spec=None,
-                            status=False,
-                            raster=None,
-                            code=code,
-                            library=library,
-                            error={
-                                "message": f"Timeout: La ejecución excedió {timeout_seconds} segundos",
-                                "traceback": "",
-                            },
-                        )
-                    )
-                else:
-                    result = queue_result.get_nowait()
-                    charts.append(result)
-                
-            except Exception as exception_error:
-                print(f"Error inesperado:\n{str(exception_error)}")
-                print(f"Traceback:\n{traceback.format_exc()}")
-                if return_error:
-                    charts.append(
-                        ChartExecutorResponse(
-                            index=goal["index"],
-                            goal_question=goal["question"],
-                            goal_visualization=goal["visualization"],
-                            goal_rationale=goal["rationale"],
-                            spec=None,
-                            status=False,
-                            raster=None,
-                            code=code,
-                            library=library,
-                            error={
-                                "message": str(exception_error),
-                                "traceback": traceback.format_exc(),
-                            },
-                        )
-                    )
-            finally:
-                plt.close('all')
-                print("Paso 11: Estado limpiado")
-        
-        print("Paso 12: Ejecución completada")
-        return charts
\ No newline at end of file
+        fingerprint = dataset_fingerprint(data) if isinstance(data, pd.DataFrame) else None
+
+        if self.backend == "process" and isinstance(data, pd.DataFrame):
+            # Se publica una vez por dataset y los trabajadores lo mapean sin copiarlo
+            data = get_shared_store().publish(data) or data
+
+        goals = goals_with_code["goals"]
+        n_concurrent = min(max_concurrency, len(goals))
+        if n_concurrent > 1:
+            with ThreadPoolExecutor(max_workers=n_concurrent) as pool:
+                results = list(pool.map(
+                    lambda goal: self._execute_goal(goal, data, library, return_error, timeout_seconds, fingerprint,
+                                                    render_options, summary),
+                    goals
+                ))
+        else:
+            results = [self._execute_goal(goal, data, library, return_error, timeout_seconds, fingerprint,
+                                          render_options, summary)
+                       for goal in goals]
+
+        charts = [result for result in results if result is not None]
+        print("Paso 3: Ejecución completada")
+        return charts
+
+    def release_dataset(self, data):
+        """
+        Libera el dataset publicado para los trabajadores (p. ej. al cambiar de dataset).
+        Los datasets del registro compartido se retiran cuando el registro los desaloja,
+        ya que otras sesiones pueden estar usándolos.
+        """
+        if isinstance(data, pd.DataFrame):
+            fingerprint = dataset_fingerprint(data)
+            if fingerprint not in get_dataset_registry():
+                get_shared_store().release(fingerprint)
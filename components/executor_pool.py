@@ -0,0 +1,180 @@
+import atexit
+import multiprocessing
+import os
+import queue
+import threading
+import traceback
+
+
+class ChartTimeoutError(Exception):
+    """La ejecución de un gráfico excedió el tiempo permitido"""
+
+
+class ChartExecutionError(Exception):
+    """El código generado falló dentro del proceso trabajador"""
+
+    def __init__(self, message, error_traceback=""):
+        super().__init__(message)
+        self.message = message
+        self.traceback = error_traceback
+
+
+def _worker_main(conn):
+    """
+    Bucle principal de un proceso trabajador.
+    Precarga una sola vez los módulos permitidos al código generado (pandas,
+    matplotlib con Agg, seaborn...) y luego ejecuta los gráficos que recibe por la
+    tubería devolviendo la imagen en bytes.
+    """
+    import matplotlib
+    matplotlib.use('Agg')
+    import pandas
+    from . import executor, shared_data
+    from .execution_namespace import get_execution_namespace
+
+    get_execution_namespace().warm()
+
+    # Los datasets mapeados se comparten entre ejecuciones: con copy-on-write
+    # el código generado puede modificar su copia sin alterar el original
+    pandas.set_option("mode.copy_on_write", True)
+
+    conn.send(("ready",))
+    while True:
+        try:
+            task = conn.recv()
+        except (EOFError, KeyboardInterrupt):
+            break
+        if task is None:
+            break
+
+        code, data, render_options = task
+        try:
+            if isinstance(data, shared_data.SharedDataset):
+                data = shared_data.attach_dataset(data)
+            conn.send(("ok", executor.render_chart(code, data, render_options)))
+        except Exception as exception_error:
+            conn.send(("error", str(exception_error), traceback.format_exc()))
+
+
+class _Worker():
+    def __init__(self, process, conn):
+        self.process = process
+        self.conn = conn
+        self.ready = False
+
+
+class ChartWorkerPool():
+    """
+    Pool de procesos precalentados para ejecutar el código generado por el LLM.
+    A diferencia de un hilo, un proceso que excede el tiempo se puede terminar,
+    por lo que timeout_seconds es un límite real.
+    """
+
+    def __init__(self, n_workers=None, startup_timeout=120):
+        self.n_workers = n_workers or min(4, os.cpu_count() or 1)
+        self.startup_timeout = startup_timeout
+        self._ctx = multiprocessing.get_context("spawn")
+        self._idle = queue.Queue()
+        self._lock = threading.Lock()
+        self._workers = set()
+        self._closed = False
+
+        for _ in range(self.n_workers):
+            self._idle.put(self._start_worker())
+
+    def _start_worker(self):
+        parent_conn, child_conn = self._ctx.Pipe()
+        process = self._ctx.Process(target=_worker_main, args=(child_conn,), daemon=True)
+        process.start()
+        child_conn.close()
+
+        worker = _Worker(process, parent_conn)
+        with self._lock:
+            self._workers.add(worker)
+        return worker
+
+    def _stop_worker(self, worker):
+        with self._lock:
+            self._workers.discard(worker)
+        if worker.process.is_alive():
+            worker.process.terminate()
+            worker.process.join(timeout=1)
+            if worker.process.is_alive():
+                worker.process.kill()
+                worker.process.join()
+        worker.conn.close()
+
+    def _replace_worker(self, worker):
+        """Termina el trabajador y deja uno nuevo disponible en su lugar"""
+        self._stop_worker(worker)
+        if not self._closed:
+            self._idle.put(self._start_worker())
+
+    def _wait_ready(self, worker):
+        # El precalentamiento no cuenta dentro del timeout del gráfico
+        if worker.ready:
+            return
+        if not worker.conn.poll(self.startup_timeout):
+            raise RuntimeError("El proceso de ejecución no terminó de iniciar")
+        worker.conn.recv()
+        worker.ready = True
+
+    def run(self, code, data, timeout_seconds=10, render_options=None):
+        """
+        Ejecuta el código en un trabajador libre y devuelve la imagen en bytes
+        (render_options: ver executor.RenderOptions).
+        data puede ser un DataFrame (se serializa) o un SharedDataset (se mapea).
+        Lanza ChartTimeoutError si se excede timeout_seconds (el trabajador se
+        reemplaza) y ChartExecutionError si el código falla.
+        """
+        if self._closed:
+            raise RuntimeError("El pool de ejecución está cerrado")
+
+        worker = self._idle.get()
+        try:
+            self._wait_ready(worker)
+            worker.conn.send((code, data, render_options))
+            if not worker.conn.poll(timeout_seconds):
+                self._replace_worker(worker)
+                worker = None
+                raise ChartTimeoutError(f"Timeout: La ejecución excedió {timeout_seconds} segundos")
+            message = worker.conn.recv()
+        except (EOFError, OSError, RuntimeError):
+            if worker is not None:
+                self._replace_worker(worker)
+                worker = None
+            raise RuntimeError("El proceso de ejecución terminó inesperadamente")
+        finally:
+            if worker is not None:
+                self._idle.put(worker)
+
+        if message[0] == "ok":
+            return message[1]
+        raise ChartExecutionError(message[1], message[2])
+
+    def shutdown(self):
+        self._closed = True
+        with self._lock:
+            workers = list(self._workers)
+        for worker in workers:
+            try:
+                worker.conn.send(None)
+            except (OSError, ValueError):
+                pass
+            self._stop_worker(worker)
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_worker_pool(n_workers=None):
+    """
+    Devuelve el pool compartido por todo el proceso (todas las sesiones de Streamlit)
+    """
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ChartWorkerPool(n_workers=n_workers)
+            atexit.register(_pool.shutdown)
+        return _pool
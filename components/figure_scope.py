@@ -0,0 +1,122 @@
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+
+import matplotlib
+matplotlib.use('Agg')
+import matplotlib.pyplot as plt
+from matplotlib import _pylab_helpers
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.figure import Figure
+
+
+class _ThreadLocalFigures():
+    """
+    Sustituto de Gcf.figs (el registro de figuras de pyplot) con un registro por hilo.
+    Así plt.figure, plt.gca, plt.clf, plt.close('all'), plt.savefig... y las
+    funciones de seaborn que llaman a plt.gca() solo ven las figuras del hilo que
+    las creó, y dos renders simultáneos no se pisan ni se cierran entre sí.
+    """
+
+    def __init__(self, figures=None):
+        self._local = threading.local()
+        # Las figuras que ya existían quedan en el hilo que instala el registro
+        self._local.figures = OrderedDict(figures or {})
+
+    @property
+    def _figures(self):
+        figures = getattr(self._local, "figures", None)
+        if figures is None:
+            figures = self._local.figures = OrderedDict()
+        return figures
+
+    def __getattr__(self, name):
+        # get, pop, values, move_to_end, clear...
+        return getattr(self._figures, name)
+
+    def __getitem__(self, key):
+        return self._figures[key]
+
+    def __setitem__(self, key, value):
+        self._figures[key] = value
+
+    def __delitem__(self, key):
+        del self._figures[key]
+
+    def __contains__(self, key):
+        return key in self._figures
+
+    def __iter__(self):
+        return iter(self._figures)
+
+    def __reversed__(self):
+        return reversed(self._figures)
+
+    def __len__(self):
+        return len(self._figures)
+
+    def __bool__(self):
+        return bool(self._figures)
+
+
+class _ThreadLocalRcParams(matplotlib.RcParams):
+    """
+    rcParams con cambios locales al hilo: dentro de figure_scope, lo que cambie el
+    código (sns.set_theme, plt.style.use, plt.rcParams[...] = ...) solo se ve en
+    ese hilo y se descarta al salir. Fuera de figure_scope se comporta igual que
+    matplotlib.RcParams. _get y _set son los únicos accesos directos a los valores.
+    """
+
+    _local = threading.local()
+
+    def _get(self, key):
+        overrides = getattr(self._local, "overrides", None)
+        if overrides is not None and key in overrides:
+            return overrides[key]
+        return dict.__getitem__(self, key)
+
+    def _set(self, key, val):
+        overrides = getattr(self._local, "overrides", None)
+        if overrides is not None:
+            overrides[key] = val
+        else:
+            dict.__setitem__(self, key, val)
+
+
+_install_lock = threading.Lock()
+
+
+def install_thread_local_pyplot():
+    """
+    Hace que el estado de pyplot (figura y ejes actuales) y los cambios de
+    rcParams dentro de figure_scope sean propios de cada hilo
+    """
+    with _install_lock:
+        if not isinstance(_pylab_helpers.Gcf.figs, _ThreadLocalFigures):
+            _pylab_helpers.Gcf.figs = _ThreadLocalFigures(_pylab_helpers.Gcf.figs)
+        if not isinstance(matplotlib.rcParams, _ThreadLocalRcParams):
+            # Se cambia la clase del objeto porque todos los módulos comparten esa instancia
+            matplotlib.rcParams.__class__ = _ThreadLocalRcParams
+
+
+@contextmanager
+def figure_scope():
+    """
+    Render aislado: crea una Figure con su FigureCanvasAgg y la registra como la
+    figura actual de pyplot en este hilo, de modo que el código que usa plt.* (o
+    seaborn) dibuja en ella. Los cambios de rcParams (p. ej. sns.set_theme) solo
+    afectan a este render y todas las figuras del hilo se cierran al salir.
+    Devuelve la figura inicial; si el código crea otra (plt.figure, plt.subplots),
+    la figura a guardar es plt.gcf().
+    """
+    install_thread_local_pyplot()
+    plt.close('all')
+    _ThreadLocalRcParams._local.overrides = {}
+    try:
+        figure = Figure()
+        canvas = FigureCanvasAgg(figure)
+        _pylab_helpers.Gcf._set_new_active_manager(FigureCanvasAgg.manager_class(canvas, 1))
+        yield figure
+    finally:
+        plt.close('all')
+        _ThreadLocalRcParams._local.overrides = None
@@ -0,0 +1,14 @@
+import os
+import threading
+
+
+def atomic_write(path, payload):
+    """
+    Escribe los bytes en un fichero temporal propio del proceso y del hilo y lo
+    mueve a su ruta final: quien lee el fichero nunca ve una escritura a medias y
+    varias escrituras simultáneas del mismo fichero no se pisan el temporal
+    """
+    tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(tmp_path, "wb") as file:
+        file.write(payload)
+    os.replace(tmp_path, path)
@@ -23,12 +23,18 @@ class GoalExplorer():
                  config, 
                  client, 
                  persona="A highly skilled data analyst who can come up with complex, insightful goals about data", 
-                 n=3):
+                 n=3,
+                 on_item=None):
         """
-        Generar objetivos a partir de un resumen de datos
+        Generar objetivos a partir de un resumen de datos.
+        on_item => callback que recibe cada objetivo en cuanto se completa (streaming)
         """
 
         json_schema = DataGoals.model_json_schema()
+        # Si el resumen no cabe entero se priorizan las columnas afines a la persona
+        summary = component_utils.serialize_summary(summary, stage="goal",
+                                                    max_tokens=component_utils.get_summary_token_budget(config),
+                                                    context=persona)
 
         messages = [
             {"role": "system", "content": component_utils.get_goal_sys_prompt()},
@@ -38,7 +44,9 @@ class GoalExplorer():
         llm_goals = llm_utils.get_llm_answer(client, 
                                              config["dynamic_config"]["dynamic_model_name"], 
                                              messages, 
-                                             guided_json=json_schema)
+                                             guided_json=json_schema,
+                                             on_partial=utils.get_json_items_callback("goals", on_item) if on_item else None,
+                                             **llm_utils.get_sampling_options(config))
         
         try:
             return json_repair.repair_json(llm_goals, ensure_ascii=False, return_objects=True)
@@ -0,0 +1,125 @@
+import contextlib
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+
+
+class LLMResponseCache():
+    """
+    Caché persistente (SQLite) de respuestas del LLM direccionada por contenido:
+    la clave es el hash del modelo, los mensajes, los parámetros de muestreo
+    y el esquema guided_json. Expira por TTL y desaloja por LRU según tamaño.
+    """
+
+    def __init__(self,
+                 path=".cache/llm_cache.sqlite",
+                 ttl_seconds=7 * 24 * 3600,
+                 max_bytes=256 * 1024 * 1024):
+        self.path = path
+        self.ttl_seconds = ttl_seconds
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                """CREATE TABLE IF NOT EXISTS responses (
+                       key TEXT PRIMARY KEY,
+                       value TEXT NOT NULL,
+                       size INTEGER NOT NULL,
+                       created_at REAL NOT NULL,
+                       accessed_at REAL NOT NULL
+                   )"""
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_accessed_at ON responses (accessed_at)")
+
+    @contextlib.contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=30)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    @staticmethod
+    def make_key(model, messages, params):
+        """
+        Hash estable de la petición (params incluye muestreo y guided_json)
+        """
+        payload = json.dumps({"model": model, "messages": messages, "params": params},
+                             sort_keys=True, ensure_ascii=False, default=str)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def get(self, key):
+        now = time.time()
+        with self._lock, self._connect() as conn:
+            row = conn.execute("SELECT value, created_at FROM responses WHERE key = ?", (key,)).fetchone()
+            if row is None or now - row[1] > self.ttl_seconds:
+                if row is not None:
+                    conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+                self.misses += 1
+                return None
+            conn.execute("UPDATE responses SET accessed_at = ? WHERE key = ?", (now, key))
+            self.hits += 1
+            return row[0]
+
+    def set(self, key, value):
+        now = time.time()
+        size = len(value.encode("utf-8"))
+        with self._lock, self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO responses (key, value, size, created_at, accessed_at) VALUES (?, ?, ?, ?, ?)",
+                (key, value, size, now, now)
+            )
+            self._evict(conn, now)
+
+    def _evict(self, conn, now):
+        conn.execute("DELETE FROM responses WHERE created_at < ?", (now - self.ttl_seconds,))
+        total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        # Se eliminan las entradas usadas hace más tiempo hasta volver al límite
+        for key, size in conn.execute("SELECT key, size FROM responses ORDER BY accessed_at ASC").fetchall():
+            conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+            total -= size
+            if total <= self.max_bytes:
+                break
+
+    def stats(self):
+        with self._lock, self._connect() as conn:
+            entries, total = conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM responses").fetchone()
+        return {"hits": self.hits, "misses": self.misses, "entries": entries, "bytes": total}
+
+    def clear(self):
+        with self._lock, self._connect() as conn:
+            conn.execute("DELETE FROM responses")
+        self.hits = 0
+        self.misses = 0
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_llm_cache():
+    """Devuelve la caché compartida por todo el proceso"""
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = LLMResponseCache()
+        return _cache
+
+
+def set_llm_cache(cache):
+    """Sustituye la caché compartida (p. ej. con otra ruta, TTL o tamaño)"""
+    global _cache
+    with _cache_lock:
+        _cache = cache
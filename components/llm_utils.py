@@ -1,5 +1,38 @@
+import asyncio
 import json
-from openai import OpenAI
+import threading
+import httpx
+from .llm_cache import LLMResponseCache, get_llm_cache
+from .prefix_tracker import get_prefix_tracker
+
+_clients = {}
+_clients_lock = threading.Lock()
+
+
+def _get_client(provider, base_url, api_key, max_connections=20):
+    """
+    Cliente OpenAI del proveedor, creado una sola vez por proceso: todas las
+    sesiones y reejecuciones de Streamlit comparten su pool de conexiones
+    keep-alive. Si cambia la url o la clave (configuración recargada) se crea uno
+    nuevo; el anterior no se cierra porque otra sesión puede estar usándolo.
+    """
+    from openai import OpenAI
+
+    with _clients_lock:
+        entry = _clients.get(provider)
+        if entry is not None and entry[0] == (base_url, api_key):
+            return entry[1]
+        client = OpenAI(
+            base_url=base_url,
+            api_key=api_key,
+            http_client=httpx.Client(
+                limits=httpx.Limits(max_connections=max_connections,
+                                    max_keepalive_connections=max_connections)
+            )
+        )
+        _clients[provider] = ((base_url, api_key), client)
+        return client
+
 
 def load_llm_client(config, provider="vllm"):
     """
@@ -7,20 +40,22 @@ def load_llm_client(config, provider="vllm"):
     Devuelve la configuración del yaml y el cliente
     """
     if provider == "vllm":
-        client = OpenAI(
+        client = _get_client(
+            provider,
             base_url = config["vllm_config"]["vllm_base_url"],
             api_key = config["api_keys"]["vllm"]
         )
-        config["dynamic_config"]["dynamic_model_name"] = config["vllm_config"]["vllm_model_name"] 
+        config["dynamic_config"]["dynamic_model_name"] = config["vllm_config"]["vllm_model_name"]
 
         return config, client
-        
+
     elif provider == "openrouter":
-        client = OpenAI(
+        client = _get_client(
+            provider,
             base_url=config["openrouter_config"]["openrouter_base_url"],
             api_key=config["api_keys"]["openrouter"]
         )
-        config["dynamic_config"]["dynamic_model_name"] = config["openrouter_config"]["openrouter_model_name"] 
+        config["dynamic_config"]["dynamic_model_name"] = config["openrouter_config"]["openrouter_model_name"]
 
         return config, client
 
@@ -28,16 +63,84 @@ def load_llm_client(config, provider="vllm"):
         return None, None
 
 
-def get_llm_answer(client, model, messages, guided_json=None):
+# Bucle de eventos compartido por todo el proceso. Los clientes asíncronos y su
+# pool de conexiones viven en este bucle, así se reutilizan entre llamadas.
+_loop = None
+_loop_thread = None
+_loop_lock = threading.Lock()
+
+_async_clients = {}
+_async_clients_lock = threading.Lock()
+_semaphores = {}
+
+
+def _get_event_loop():
+    global _loop, _loop_thread
+    with _loop_lock:
+        if _loop is None:
+            _loop = asyncio.new_event_loop()
+            _loop_thread = threading.Thread(target=_loop.run_forever, name="llm-event-loop", daemon=True)
+            _loop_thread.start()
+        return _loop
+
+
+def run_async(coroutine):
     """
-    Realiza la petición al proveedor y devuelve la respuesta
-    del llm
+    Ejecuta una corrutina en el bucle compartido y espera su resultado
+    (punto de entrada de los envoltorios síncronos)
     """
-    answer = client.chat.completions.create(
-        model=model,
-        messages=messages,
-        temperature=1.0,
-        extra_body={
+    loop = _get_event_loop()
+    if threading.current_thread() is _loop_thread:
+        raise RuntimeError("run_async no se puede llamar desde el bucle de eventos del LLM, usa await")
+    return asyncio.run_coroutine_threadsafe(coroutine, loop).result()
+
+
+def get_async_client(client, max_connections=20):
+    """
+    Devuelve el AsyncOpenAI equivalente a un cliente síncrono (mismo base_url y api_key).
+    Se crea una sola vez por proveedor y comparte su pool de conexiones keep-alive.
+    """
+    from openai import AsyncOpenAI
+
+    key = (str(client.base_url), client.api_key)
+    with _async_clients_lock:
+        if key not in _async_clients:
+            _async_clients[key] = AsyncOpenAI(
+                base_url=client.base_url,
+                api_key=client.api_key,
+                http_client=httpx.AsyncClient(
+                    limits=httpx.Limits(max_connections=max_connections,
+                                        max_keepalive_connections=max_connections)
+                )
+            )
+        return _async_clients[key]
+
+
+def _get_semaphore(async_client, max_concurrency):
+    # Solo se llama desde el bucle de eventos, no necesita lock
+    key = (id(async_client), max_concurrency)
+    if key not in _semaphores:
+        _semaphores[key] = asyncio.Semaphore(max_concurrency)
+    return _semaphores[key]
+
+
+def get_sampling_options(config):
+    """
+    Opciones de muestreo elegidas en la interfaz (temperatura y uso de la caché)
+    """
+    return {
+        "temperature": config["dynamic_config"].get("temperature", 1.0),
+        "use_cache": config["dynamic_config"].get("use_llm_cache", None),
+    }
+
+
+def get_request_params(guided_json=None, temperature=1.0):
+    """
+    Parámetros de muestreo comunes a todas las peticiones
+    """
+    return {
+        "temperature": temperature,
+        "extra_body": {
             'repetition_penalty': 1,
             'top_p': 0.95,
             #'frequency_penalty': 0,
@@ -48,7 +151,137 @@ def get_llm_answer(client, model, messages, guided_json=None):
             #'seed':42,
             'max_tokens': 4096,
             'guided_json': guided_json
-        })
-    
-    return answer.choices[0].message.content.strip()
-        
\ No newline at end of file
+        }
+    }
+
+
+def _get_cache_key(client, model, messages, guided_json, temperature, use_cache):
+    """
+    Clave de caché de la petición, o None si no se debe usar la caché.
+    Con temperatura > 0 la caché solo se usa si se pide explícitamente (use_cache=True).
+    """
+    if use_cache is None:
+        use_cache = temperature == 0
+    if not use_cache:
+        return None
+    params = get_request_params(guided_json, temperature=temperature)
+    params["base_url"] = str(client.base_url)
+    return LLMResponseCache.make_key(model, messages, params)
+
+
+async def get_llm_answer_async(async_client, model, messages, guided_json=None, max_concurrency=8,
+                               temperature=1.0, use_cache=None):
+    """
+    Versión asíncrona de get_llm_answer. Como máximo max_concurrency peticiones
+    por cliente están en vuelo a la vez.
+    """
+    cache_key = _get_cache_key(async_client, model, messages, guided_json, temperature, use_cache)
+    if cache_key is not None:
+        cached_answer = get_llm_cache().get(cache_key)
+        if cached_answer is not None:
+            return cached_answer
+
+    get_prefix_tracker().record(model, messages)
+    async with _get_semaphore(async_client, max_concurrency):
+        answer = await async_client.chat.completions.create(
+            model=model,
+            messages=messages,
+            **get_request_params(guided_json, temperature=temperature)
+        )
+
+    get_prefix_tracker().record_usage(answer.usage)
+    answer = answer.choices[0].message.content.strip()
+    if cache_key is not None:
+        get_llm_cache().set(cache_key, answer)
+    return answer
+
+
+async def get_llm_answers_async(async_client, model, messages_list, guided_json=None, max_concurrency=8,
+                                temperature=1.0, use_cache=None):
+    """
+    Lanza todas las peticiones a la vez y devuelve las respuestas en el mismo orden
+    """
+    return await asyncio.gather(*[
+        get_llm_answer_async(async_client, model, messages, guided_json=guided_json, max_concurrency=max_concurrency,
+                             temperature=temperature, use_cache=use_cache)
+        for messages in messages_list
+    ])
+
+
+def get_llm_answers(client, model, messages_list, guided_json=None, max_concurrency=8,
+                    temperature=1.0, use_cache=None):
+    """
+    Realiza varias peticiones concurrentes al proveedor (una por lista de mensajes)
+    y devuelve las respuestas del llm en el mismo orden
+    """
+    async_client = get_async_client(client)
+    return run_async(get_llm_answers_async(async_client,
+                                           model,
+                                           messages_list,
+                                           guided_json=guided_json,
+                                           max_concurrency=max_concurrency,
+                                           temperature=temperature,
+                                           use_cache=use_cache))
+
+
+def get_llm_answer(client, model, messages, guided_json=None, on_partial=None,
+                   temperature=1.0, use_cache=None):
+    """
+    Realiza la petición al proveedor y devuelve la respuesta
+    del llm. Si se pasa on_partial la respuesta se recibe en streaming.
+    use_cache => None, usa la caché solo con temperatura 0; True/False para forzarlo
+    """
+    if on_partial is not None:
+        return get_llm_answer_streamed(client, model, messages, guided_json=guided_json, on_partial=on_partial,
+                                       temperature=temperature, use_cache=use_cache)
+
+    return get_llm_answers(client, model, [messages], guided_json=guided_json,
+                           temperature=temperature, use_cache=use_cache)[0]
+
+
+def stream_llm_answer(client, model, messages, guided_json=None, temperature=1.0):
+    """
+    Realiza la petición en modo streaming y devuelve los fragmentos
+    de texto del llm según van llegando. El uso de tokens llega en el último
+    fragmento (include_usage) y se registra en el medidor de prefijos
+    """
+    stream = client.chat.completions.create(
+        model=model,
+        messages=messages,
+        stream=True,
+        stream_options={"include_usage": True},
+        **get_request_params(guided_json, temperature=temperature)
+    )
+
+    for chunk in stream:
+        if getattr(chunk, "usage", None) is not None:
+            get_prefix_tracker().record_usage(chunk.usage)
+        if chunk.choices and chunk.choices[0].delta.content:
+            yield chunk.choices[0].delta.content
+
+
+def get_llm_answer_streamed(client, model, messages, guided_json=None, on_partial=None,
+                            temperature=1.0, use_cache=None):
+    """
+    Igual que get_llm_answer pero en streaming: on_partial recibe el texto
+    acumulado cada vez que llega un fragmento nuevo
+    """
+    cache_key = _get_cache_key(client, model, messages, guided_json, temperature, use_cache)
+    if cache_key is not None:
+        cached_answer = get_llm_cache().get(cache_key)
+        if cached_answer is not None:
+            if on_partial is not None:
+                on_partial(cached_answer)
+            return cached_answer
+
+    get_prefix_tracker().record(model, messages)
+    answer = ""
+    for token in stream_llm_answer(client, model, messages, guided_json=guided_json, temperature=temperature):
+        answer += token
+        if on_partial is not None:
+            on_partial(answer)
+
+    answer = answer.strip()
+    if cache_key is not None:
+        get_llm_cache().set(cache_key, answer)
+    return answer
@@ -21,10 +21,16 @@ class PersonaExplorer():
                  summary, 
                  config,
                  client, 
-                 n=3):
-        """Generate personas given a summary of data"""
+                 n=3,
+                 on_item=None):
+        """
+        Generate personas given a summary of data.
+        on_item => callback que recibe cada persona en cuanto se completa (streaming)
+        """
         
         json_schema = DataPersona.model_json_schema()
+        summary = component_utils.serialize_summary(summary, stage="persona",
+                                                    max_tokens=component_utils.get_summary_token_budget(config))
 
         messages = [
             {"role": "system", "content": component_utils.get_persona_sys_prompt()},
@@ -34,7 +40,9 @@ class PersonaExplorer():
         llm_personas = llm_utils.get_llm_answer(client, 
                                                 config["dynamic_config"]["dynamic_model_name"], 
                                                 messages, 
-                                                guided_json=json_schema)
+                                                guided_json=json_schema,
+                                                on_partial=utils.get_json_items_callback("personas", on_item) if on_item else None,
+                                                **llm_utils.get_sampling_options(config))
 
         try:
             return json_repair.repair_json(llm_personas, ensure_ascii=False, return_objects=True)
@@ -0,0 +1,93 @@
+import hashlib
+import threading
+from collections import OrderedDict
+
+
+class PrefixReuseTracker():
+    """
+    Mide cuánto de cada prompt comparte prefijo con prompts ya enviados al mismo
+    modelo, como hace el caché automático de prefijos de vLLM: el prompt se parte
+    en bloques y cada bloque se identifica por el hash encadenado de todos los
+    anteriores, así que solo cuentan los bloques iniciales idénticos.
+    Las cifras en tokens son estimaciones (chars_per_token); si el servidor informa
+    de los tokens servidos desde su caché (usage.prompt_tokens_details.cached_tokens)
+    también se acumulan.
+    """
+
+    def __init__(self, block_chars=256, max_blocks=200_000, chars_per_token=4):
+        self.block_chars = block_chars
+        self.max_blocks = max_blocks
+        self.chars_per_token = chars_per_token
+        self.requests = 0
+        self.prompt_chars = 0
+        self.reused_chars = 0
+        self.server_prompt_tokens = 0
+        self.server_cached_tokens = 0
+        self._blocks = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def render(messages):
+        """Texto del prompt en el orden en que lo ve el modelo"""
+        return "".join(f"<{message['role']}>\n{message['content']}\n" for message in messages)
+
+    def record(self, model, messages):
+        """Registra un prompt enviado y devuelve los caracteres de prefijo ya vistos"""
+        text = self.render(messages)
+        digest = hashlib.sha256(str(model).encode("utf-8"))
+        reused = 0
+        reusing = True
+        with self._lock:
+            # Solo los bloques completos se pueden reutilizar
+            for start in range(0, len(text) - self.block_chars + 1, self.block_chars):
+                digest.update(text[start:start + self.block_chars].encode("utf-8"))
+                key = digest.copy().hexdigest()
+                if reusing and key in self._blocks:
+                    self._blocks.move_to_end(key)
+                    reused += self.block_chars
+                else:
+                    reusing = False
+                    self._blocks[key] = None
+            while len(self._blocks) > self.max_blocks:
+                self._blocks.popitem(last=False)
+
+            self.requests += 1
+            self.prompt_chars += len(text)
+            self.reused_chars += reused
+        return reused
+
+    def record_usage(self, usage):
+        """Acumula los tokens de prompt y de caché que informa el servidor (si los informa)"""
+        if usage is None:
+            return
+        details = getattr(usage, "prompt_tokens_details", None)
+        cached_tokens = getattr(details, "cached_tokens", None) if details is not None else None
+        if cached_tokens is None:
+            return
+        with self._lock:
+            self.server_prompt_tokens += usage.prompt_tokens or 0
+            self.server_cached_tokens += cached_tokens
+
+    def stats(self):
+        with self._lock:
+            return {
+                "requests": self.requests,
+                "prompt_tokens": self.prompt_chars // self.chars_per_token,
+                "reused_tokens": self.reused_chars // self.chars_per_token,
+                "reuse_ratio": self.reused_chars / self.prompt_chars if self.prompt_chars else 0.0,
+                "server_prompt_tokens": self.server_prompt_tokens,
+                "server_cached_tokens": self.server_cached_tokens,
+            }
+
+
+_tracker = None
+_tracker_lock = threading.Lock()
+
+
+def get_prefix_tracker():
+    """Devuelve el medidor de reutilización de prefijos compartido por todo el proceso"""
+    global _tracker
+    with _tracker_lock:
+        if _tracker is None:
+            _tracker = PrefixReuseTracker()
+        return _tracker
@@ -0,0 +1,382 @@
+import warnings
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+
+import pandas as pd
+from pandas.tseries.api import guess_datetime_format
+
+from .sketches import DistinctReservoir, HyperLogLog, RunningMoments, hash_values
+
+
+def check_type(dtype, value):
+    """
+    Convierte el valor al tipo correcto para asegurar que es serializable con JSON
+    """
+
+    if "float" in str(dtype):
+        return float(value)
+
+    elif "int" in str(dtype):
+        return int(value)
+
+    else:
+        return value
+
+
+def is_number_dtype(dtype):
+    """
+    Columnas numéricas (no booleanas), incluidas las reducidas (int8, float32...)
+    y las enteras con nulos de pandas (Int64)
+    """
+    return dtype in [int, float, complex] or (pd.api.types.is_numeric_dtype(dtype) and not pd.api.types.is_bool_dtype(dtype))
+
+
+def is_text_dtype(dtype):
+    """Columnas de texto: object o cadenas de pandas/Arrow (string[pyarrow])"""
+    return dtype == object or isinstance(dtype, pd.StringDtype)
+
+
+def _numeric_moments(df, positions):
+    """
+    Media, desviación, mínimo y máximo de las columnas numéricas.
+    Las columnas se agrupan por dtype para que cada grupo sea un único bloque
+    y cada estadística se calcule en una sola pasada vectorizada.
+    """
+    moments = {}
+    groups = {}
+    for position in positions:
+        groups.setdefault(df.dtypes.iloc[position], []).append(position)
+
+    for dtype, group_positions in groups.items():
+        block = df.iloc[:, group_positions]
+        block.columns = range(len(group_positions))
+        if pd.api.types.is_float_dtype(dtype) and dtype.itemsize < 8:
+            # Columnas compactadas a float32: las estadísticas se acumulan en float64
+            block = block.astype("float64")
+        stats = {
+            "mean": block.mean().to_numpy(),
+            "std": block.std().to_numpy(),
+            "min": block.min().to_numpy(),
+            "max": block.max().to_numpy(),
+        }
+        for offset, position in enumerate(group_positions):
+            moments[position] = {name: check_type(dtype, values[offset]) for name, values in stats.items()}
+
+    return moments
+
+
+@lru_cache(maxsize=4096)
+def _guess_datetime_format(value):
+    return guess_datetime_format(value)
+
+
+def _to_datetime(values, date_format=None):
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")
+        return pd.to_datetime(values, format=date_format, errors='raise')
+
+
+def parse_datetime_column(series, sample_size=100, na_count=None):
+    """
+    Intenta convertir una columna object a fecha sin recorrerla entera si no lo es.
+    Igual que pd.to_datetime, el formato se infiere una sola vez a partir del primer
+    valor no nulo; primero se prueba con una muestra acotada (ese primer valor, los
+    siguientes y otros al azar) y solo si la muestra pasa se confirma en toda la columna
+    con el formato ya inferido. Devuelve la columna convertida o None si no es fecha.
+    na_count => número de nulos ya conocido, evita recorrer la columna si es 0
+    """
+    non_null = series if na_count == 0 else series.dropna()
+    if non_null.empty:
+        return _to_datetime(series)
+
+    sample = non_null.iloc[:sample_size // 2]
+    if len(non_null) > sample_size:
+        sample = pd.concat([sample, non_null.sample(sample_size // 2, random_state=42)])
+
+    first_value = non_null.iloc[0]
+    date_format = _guess_datetime_format(first_value) if isinstance(first_value, str) else None
+
+    try:
+        _to_datetime(sample, date_format)
+    except (ValueError, TypeError):
+        # Si falla algún valor de la muestra también falla la columna completa
+        return None
+
+    try:
+        return _to_datetime(series, date_format)
+    except (ValueError, TypeError):
+        return None
+
+
+def _infer_object_dtype(series, n_unique, na_count):
+    """
+    Tipo de una columna object: fecha si toda la columna se puede convertir,
+    si no categoría o texto según el número de valores distintos.
+    Devuelve también la columna ya convertida a fecha (o None).
+    """
+    parsed_dates = parse_datetime_column(series, na_count=na_count)
+    if parsed_dates is not None:
+        return "date", parsed_dates
+
+    #if df[column].nunique() / len(df[column]) < 0.5:
+    return ("category" if n_unique < 10 else "string"), None
+
+
+def _profile_column(series, na_count, n_rows, moments, n_samples):
+    """
+    Propiedades de una columna. Una sola llamada a unique() sirve para el número
+    de valores distintos, para decidir si es categoría y para los ejemplos.
+    """
+    dtype = series.dtype
+    properties = {}
+    parsed_dates = None
+
+    properties["na_count"] = na_count
+    properties["non_na_count"] = n_rows - na_count
+
+    uniques = series.unique()
+    non_null_uniques = uniques[pd.notna(uniques)]
+    n_unique = len(non_null_uniques)
+
+    if is_number_dtype(dtype):
+        properties["dtype"] = "number"
+        properties.update(moments)
+
+    elif dtype == bool:
+        properties["dtype"] = "boolean"
+
+    elif is_text_dtype(dtype):
+        properties["dtype"], parsed_dates = _infer_object_dtype(series, n_unique, na_count)
+
+    elif isinstance(dtype, pd.CategoricalDtype):
+        properties["dtype"] = "category"
+
+    elif pd.api.types.is_datetime64_any_dtype(series):
+        properties["dtype"] = "date"
+
+    else:
+        properties["dtype"] = str(dtype)
+
+    # añadir min max si dtype es fecha
+    if properties["dtype"] == "date":
+        try:
+            properties["min"] = series.min()
+            properties["max"] = series.max()
+        except TypeError:
+            # Se reutiliza la conversión hecha al detectar el tipo en lugar de repetirla
+            cast_date_col = parsed_dates if parsed_dates is not None else pd.to_datetime(series, errors='coerce')
+            properties["min"] = cast_date_col.min()
+            properties["max"] = cast_date_col.max()
+
+    # Info de valores distintos
+    properties["num_unique_values"] = n_unique
+
+    # Info para ejemplos (samples)
+    num_samples = min(n_samples, n_unique)
+    if num_samples == 0:
+        samples = []
+    else:
+        samples = pd.Series(non_null_uniques).sample(num_samples, random_state=42).tolist()
+    properties["samples"] = samples
+
+    return properties
+
+
+def profile_columns(df, n_samples=2, n_jobs=1):
+    """
+    Obtener las propiedades de cada columna de un DataFrame con pasadas vectorizadas:
+    los nulos de todas las columnas en una sola pasada, los momentos numéricos por
+    bloques del mismo dtype y un único unique() por columna.
+    n_jobs > 1 reparte las columnas en grupos que se procesan en paralelo (hilos).
+    Devuelve la misma lista de propiedades que Summarizer.get_column_properties.
+    """
+    n_rows = len(df)
+    na_counts = df.isna().sum().to_numpy()
+
+    numeric_positions = [position for position, dtype in enumerate(df.dtypes) if is_number_dtype(dtype)]
+    moments = _numeric_moments(df, numeric_positions)
+
+    def profile_group(positions):
+        return [
+            {"column": df.columns[position],
+             "properties": _profile_column(df.iloc[:, position],
+                                           int(na_counts[position]),
+                                           n_rows,
+                                           moments.get(position, {}),
+                                           n_samples)}
+            for position in positions
+        ]
+
+    positions = list(range(df.shape[1]))
+    if n_jobs > 1 and len(positions) > 1:
+        groups = [positions[i::n_jobs] for i in range(n_jobs)]
+        with ThreadPoolExecutor(max_workers=n_jobs) as pool:
+            results = {}
+            for group, group_properties in zip(groups, pool.map(profile_group, groups)):
+                results.update(zip(group, group_properties))
+        return [results[position] for position in positions]
+
+    return profile_group(positions)
+
+
+class _StreamingColumnProfile():
+    """
+    Estado de una columna durante el perfilado en streaming
+    """
+
+    def __init__(self, n_samples, precision):
+        self.na_count = 0
+        self.n_rows = 0
+        self.kinds = set()
+        self.numeric_dtypes = set()
+        self.hll = HyperLogLog(precision)
+        self.moments = RunningMoments()
+        self.reservoir = DistinctReservoir(n_samples)
+        self.date_candidate = True
+        self.date_min = None
+        self.date_max = None
+        self.raw_min = None
+        self.raw_max = None
+        self.raw_comparable = True
+        self.other_dtype = None
+
+    def add(self, series):
+        dtype = series.dtype
+        na_count = int(series.isna().sum())
+        self.na_count += na_count
+        self.n_rows += len(series)
+
+        hashes, non_null_values = hash_values(series)
+        self.hll.add_hashes(hashes)
+        self.reservoir.add(hashes, non_null_values)
+
+        if is_number_dtype(dtype):
+            self.kinds.add("number")
+            self.numeric_dtypes.add(str(dtype))
+            self.moments.add(non_null_values.to_numpy())
+        elif dtype == bool:
+            self.kinds.add("boolean")
+        elif is_text_dtype(dtype):
+            self.kinds.add("object")
+            if self.date_candidate and len(non_null_values) > 0:
+                parsed_dates = parse_datetime_column(series, na_count=na_count)
+                if parsed_dates is None:
+                    self.date_candidate = False
+                else:
+                    self._add_dates(parsed_dates)
+                    self._add_raw_dates(non_null_values)
+        elif isinstance(dtype, pd.CategoricalDtype):
+            self.kinds.add("category")
+        elif pd.api.types.is_datetime64_any_dtype(series):
+            self.kinds.add("date")
+            self._add_dates(series)
+        else:
+            self.kinds.add("other")
+            self.other_dtype = str(dtype)
+
+    def _add_dates(self, dates):
+        chunk_min, chunk_max = dates.min(), dates.max()
+        if pd.notna(chunk_min):
+            self.date_min = chunk_min if self.date_min is None else min(self.date_min, chunk_min)
+            self.date_max = chunk_max if self.date_max is None else max(self.date_max, chunk_max)
+
+    def _add_raw_dates(self, values):
+        # Igual que profile_columns, el mínimo y máximo de fechas en texto se toman
+        # sobre los valores originales y solo si no son comparables sobre los convertidos
+        if not self.raw_comparable:
+            return
+        try:
+            chunk_min, chunk_max = values.min(), values.max()
+            self.raw_min = chunk_min if self.raw_min is None else min(self.raw_min, chunk_min)
+            self.raw_max = chunk_max if self.raw_max is None else max(self.raw_max, chunk_max)
+        except TypeError:
+            self.raw_comparable = False
+
+    def properties(self):
+        properties = {}
+        properties["na_count"] = self.na_count
+        properties["non_na_count"] = self.n_rows - self.na_count
+
+        # La estimación de HyperLogLog puede pasarse del número de valores no nulos
+        n_unique = min(max(0, int(round(self.hll.count()))), properties["non_na_count"])
+        kinds = self.kinds or {"object"}
+
+        if kinds == {"number"}:
+            properties["dtype"] = "number"
+            # Si algún fragmento tenía nulos la columna completa sería float
+            dtype = "float64" if any("float" in numeric_dtype for numeric_dtype in self.numeric_dtypes) else self.numeric_dtypes.pop()
+            properties["mean"] = check_type(dtype, self.moments.mean) if self.moments.count else float("nan")
+            properties["std"] = check_type(dtype, self.moments.std) if self.moments.count > 1 else float("nan")
+            properties["min"] = check_type(dtype, self.moments.min) if self.moments.count else float("nan")
+            properties["max"] = check_type(dtype, self.moments.max) if self.moments.count else float("nan")
+        elif kinds == {"boolean"}:
+            properties["dtype"] = "boolean"
+        elif kinds == {"date"} or (kinds == {"object"} and self.date_candidate):
+            properties["dtype"] = "date"
+            if "object" in kinds and self.raw_comparable:
+                properties["min"] = self.raw_min
+                properties["max"] = self.raw_max
+            else:
+                properties["min"] = self.date_min
+                properties["max"] = self.date_max
+        elif kinds == {"category"}:
+            properties["dtype"] = "category"
+        elif kinds == {"other"}:
+            properties["dtype"] = self.other_dtype
+        else:
+            # Texto o tipos mezclados entre fragmentos (pandas lo leería como object)
+            properties["dtype"] = "category" if n_unique < 10 else "string"
+
+        properties["num_unique_values"] = n_unique
+        properties["samples"] = self.reservoir.sample()
+        return properties
+
+
+def profile_chunks(chunks, n_samples=2, precision=14):
+    """
+    Perfilado aproximado en una sola pasada sobre fragmentos de un fichero, sin
+    materializar el DataFrame completo:
+    - valores distintos aproximados con HyperLogLog
+    - media y desviación en streaming (Welford/Chan), mínimo y máximo exactos
+    - ejemplos con una muestra uniforme de valores distintos
+    Devuelve la lista de propiedades (mismo esquema que profile_columns) y un
+    informe con las cotas de error de la aproximación.
+    """
+    columns = {}
+    n_rows = 0
+    n_chunks = 0
+    for chunk in chunks:
+        n_chunks += 1
+        n_rows += len(chunk)
+        for position, column in enumerate(chunk.columns):
+            if column not in columns:
+                columns[column] = _StreamingColumnProfile(n_samples, precision)
+            columns[column].add(chunk.iloc[:, position])
+
+    properties_list = []
+    unique_values_ci = {}
+    for column, column_profile in columns.items():
+        properties = column_profile.properties()
+        properties_list.append({"column": column, "properties": properties})
+        estimate = properties["num_unique_values"]
+        margin = 1.96 * column_profile.hll.relative_std_error * estimate
+        upper = min(properties["non_na_count"], int(estimate + margin))
+        lower = min(max(0, int(estimate - margin)), upper)
+        unique_values_ci[column] = [lower, upper]
+
+    relative_std_error = 1.04 / (1 << precision) ** 0.5
+    approximation = {
+        "method": "streaming",
+        "rows": n_rows,
+        "chunks": n_chunks,
+        "num_unique_values": {
+            "estimator": "HyperLogLog",
+            "precision": precision,
+            "relative_std_error": round(relative_std_error, 4),
+            "confidence_interval_95": unique_values_ci,
+        },
+        "mean_std_min_max": "exact",
+        "samples": "uniform sample of distinct values",
+    }
+
+    return properties_list, approximation
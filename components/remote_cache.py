@@ -0,0 +1,152 @@
+import hashlib
+import json
+import os
+import threading
+import time
+from urllib.parse import urlparse
+
+import httpx
+
+from .fileio import atomic_write
+
+
+def is_remote_location(location):
+    return isinstance(location, str) and location.startswith(("http://", "https://"))
+
+
+class RemoteDatasetCache():
+    """
+    Caché local de los datasets remotos (URLs).
+    Cada URL se descarga una sola vez y se guarda con su nombre de fichero original.
+    Pasado max_age_seconds se revalida con una petición condicional (ETag /
+    Last-Modified); si el servidor devuelve el fichero entero se compara por hash
+    del contenido y solo se reemplaza si ha cambiado.
+    offline => valor por defecto del modo sin conexión (no hace peticiones, sirve solo
+               lo que ya está descargado); cada llamada a fetch puede indicar el suyo.
+    """
+
+    def __init__(self, cache_dir=".cache/remote", max_age_seconds=3600, offline=False, timeout_seconds=30):
+        self.cache_dir = cache_dir
+        self.max_age_seconds = max_age_seconds
+        self.offline = offline
+        self.timeout_seconds = timeout_seconds
+        self._lock = threading.Lock()
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def _entry_dir(self, url):
+        return os.path.join(self.cache_dir, hashlib.sha256(url.encode("utf-8")).hexdigest()[:32])
+
+    def _load_entry(self, url):
+        metadata_path = os.path.join(self._entry_dir(url), "metadata.json")
+        if not os.path.exists(metadata_path):
+            return None
+        with open(metadata_path, "r") as file:
+            entry = json.load(file)
+        return entry if os.path.exists(entry["path"]) else None
+
+    def _save_entry(self, url, entry):
+        metadata_path = os.path.join(self._entry_dir(url), "metadata.json")
+        atomic_write(metadata_path, json.dumps(entry, indent=2).encode("utf-8"))
+
+    def fetch(self, url, offline=None):
+        """
+        Devuelve la ruta local del dataset, descargándolo o revalidándolo si hace falta.
+        offline => None usa el modo de la caché; True/False lo fija solo para esta llamada
+        """
+        if offline is None:
+            offline = self.offline
+        with self._lock:
+            entry = self._load_entry(url)
+
+            if offline:
+                if entry is None:
+                    raise FileNotFoundError(f"No hay copia local de {url} (modo sin conexión)")
+                return entry["path"]
+
+            if entry is not None and time.time() - entry["validated_at"] < self.max_age_seconds:
+                return entry["path"]
+
+            try:
+                return self._download(url, entry)
+            except httpx.HTTPError as e:
+                if entry is None:
+                    raise
+                # Sin conexión con el servidor se sigue usando la copia local
+                print(f"No se pudo revalidar {url}, se usa la copia local: {e}")
+                return entry["path"]
+
+    def _download(self, url, entry):
+        headers = {}
+        if entry is not None:
+            if entry.get("etag"):
+                headers["If-None-Match"] = entry["etag"]
+            if entry.get("last_modified"):
+                headers["If-Modified-Since"] = entry["last_modified"]
+
+        entry_dir = self._entry_dir(url)
+        os.makedirs(entry_dir, exist_ok=True)
+        file_name = os.path.basename(urlparse(url).path) or "dataset"
+        path = os.path.join(entry_dir, file_name)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+
+        digest = hashlib.sha256()
+        with httpx.stream("GET", url, headers=headers, timeout=self.timeout_seconds, follow_redirects=True) as response:
+            if response.status_code == 304 and entry is not None:
+                entry["validated_at"] = time.time()
+                self._save_entry(url, entry)
+                return entry["path"]
+            response.raise_for_status()
+            with open(tmp_path, "wb") as file:
+                for block in response.iter_bytes():
+                    digest.update(block)
+                    file.write(block)
+            etag = response.headers.get("ETag")
+            last_modified = response.headers.get("Last-Modified")
+
+        content_hash = digest.hexdigest()
+        if entry is not None and entry["content_hash"] == content_hash:
+            # Mismo contenido: se conserva el fichero (y su mtime) para no invalidar otras cachés
+            os.remove(tmp_path)
+        else:
+            os.replace(tmp_path, path)
+
+        entry = {
+            "url": url,
+            "path": path,
+            "etag": etag,
+            "last_modified": last_modified,
+            "content_hash": content_hash,
+            "validated_at": time.time(),
+        }
+        self._save_entry(url, entry)
+        return path
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_remote_cache():
+    """Devuelve la caché de datasets remotos compartida por todo el proceso"""
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = RemoteDatasetCache()
+        return _cache
+
+
+def set_remote_cache(cache):
+    """Sustituye la caché compartida (p. ej. con otra ruta o en modo sin conexión)"""
+    global _cache
+    with _cache_lock:
+        _cache = cache
+
+
+def resolve_dataset_location(location, offline=None):
+    """
+    Ruta local del dataset: las URLs se sirven desde la caché, el resto se devuelve igual.
+    offline => modo sin conexión para esta llamada (None => el de la caché compartida)
+    """
+    if is_remote_location(location):
+        return get_remote_cache().fetch(location, offline=offline)
+    return location
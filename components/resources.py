@@ -0,0 +1,53 @@
+import base64
+import copy
+import os
+import threading
+
+from . import utils
+
+
+class _FileResourceCache():
+    """
+    Recursos derivados de ficheros (configuración, imágenes) calculados una sola
+    vez por proceso y recalculados solo cuando el fichero cambia en disco
+    (mtime o tamaño distintos).
+    """
+
+    def __init__(self):
+        self._entries = {}
+        self._lock = threading.Lock()
+
+    def get(self, path, loader):
+        stat = os.stat(path)
+        version = (stat.st_mtime_ns, stat.st_size)
+        with self._lock:
+            entry = self._entries.get((path, loader))
+            if entry is not None and entry[0] == version:
+                return entry[1]
+            if entry is not None:
+                print(f"{path} ha cambiado, se vuelve a cargar")
+            value = loader(path)
+            self._entries[(path, loader)] = (version, value)
+            return value
+
+
+_file_cache = _FileResourceCache()
+
+
+def _read_base64(path):
+    with open(path, "rb") as file:
+        return base64.b64encode(file.read()).decode()
+
+
+def get_config(config_path="config/config.yaml"):
+    """
+    Configuración del yaml, leída una sola vez por proceso y recargada cuando el
+    fichero cambia. Devuelve una copia: cada sesión puede modificar su
+    dynamic_config sin afectar a las demás.
+    """
+    return copy.deepcopy(_file_cache.get(config_path, utils.load_config))
+
+
+def get_file_base64(file_path):
+    """Contenido del fichero en base64 (p. ej. el logo), calculado una sola vez"""
+    return _file_cache.get(file_path, _read_base64)
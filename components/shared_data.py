@@ -0,0 +1,167 @@
+import atexit
+import hashlib
+import os
+import shutil
+import tempfile
+import threading
+import weakref
+from collections import OrderedDict
+from dataclasses import dataclass
+
+import pandas as pd
+
+
+@dataclass(frozen=True)
+class SharedDataset:
+    """Referencia a un dataset publicado en un fichero Arrow IPC mapeado en memoria"""
+    fingerprint: str
+    path: str
+
+
+_fingerprints = {}
+_fingerprints_lock = threading.Lock()
+
+
+def _forget_fingerprint(df_id):
+    with _fingerprints_lock:
+        _fingerprints.pop(df_id, None)
+
+
+def set_dataset_fingerprint(df, fingerprint):
+    """Asigna la huella de un DataFrame ya conocida (p. ej. la clave de su fichero de origen)"""
+    df_id = id(df)
+    with _fingerprints_lock:
+        _fingerprints[df_id] = fingerprint
+    weakref.finalize(df, _forget_fingerprint, df_id)
+
+
+def dataset_fingerprint(df):
+    """
+    Huella del contenido de un DataFrame (columnas, tipos, índice y valores).
+    Se calcula una sola vez por objeto mientras siga vivo, por lo que el DataFrame
+    no debe modificarse en sitio después de publicarlo.
+    """
+    df_id = id(df)
+    with _fingerprints_lock:
+        if df_id in _fingerprints:
+            return _fingerprints[df_id]
+
+    digest = hashlib.sha256()
+    digest.update(repr([(str(col), str(dtype)) for col, dtype in df.dtypes.items()]).encode("utf-8"))
+    digest.update(str(df.shape).encode("utf-8"))
+    try:
+        digest.update(pd.util.hash_pandas_object(df, index=True).values.tobytes())
+    except TypeError:
+        # Columnas con objetos no hasheables (listas, dicts...)
+        digest.update(df.to_csv(index=True).encode("utf-8"))
+    fingerprint = digest.hexdigest()[:32]
+
+    set_dataset_fingerprint(df, fingerprint)
+    return fingerprint
+
+
+class SharedDatasetStore():
+    """
+    Publica cada dataset una sola vez como fichero Arrow IPC (en /dev/shm si existe)
+    para que los procesos trabajadores lo mapeen en memoria sin copiarlo ni
+    recibirlo serializado en cada gráfico.
+    """
+
+    def __init__(self, base_dir=None):
+        if base_dir is None:
+            shm_dir = "/dev/shm"
+            parent_dir = shm_dir if os.path.isdir(shm_dir) and os.access(shm_dir, os.W_OK) else None
+            base_dir = tempfile.mkdtemp(prefix="lida_datasets_", dir=parent_dir)
+        os.makedirs(base_dir, exist_ok=True)
+        self.base_dir = base_dir
+        self._published = {}
+        self._lock = threading.Lock()
+
+    def publish(self, df):
+        """
+        Devuelve el SharedDataset del DataFrame, escribiéndolo solo si no estaba publicado.
+        Devuelve None si el DataFrame no se puede representar en Arrow.
+        """
+        import pyarrow as pa
+
+        fingerprint = dataset_fingerprint(df)
+        with self._lock:
+            if fingerprint in self._published:
+                return self._published[fingerprint]
+
+            path = os.path.join(self.base_dir, f"{fingerprint}.arrow")
+            tmp_path = f"{path}.{os.getpid()}.tmp"
+            try:
+                table = pa.Table.from_pandas(df)
+                with pa.OSFile(tmp_path, "wb") as sink:
+                    with pa.ipc.new_file(sink, table.schema) as writer:
+                        writer.write_table(table)
+                os.replace(tmp_path, path)
+            except (pa.ArrowException, TypeError, ValueError) as e:
+                print(f"No se pudo publicar el dataset en memoria compartida: {e}")
+                if os.path.exists(tmp_path):
+                    os.remove(tmp_path)
+                return None
+
+            shared = SharedDataset(fingerprint=fingerprint, path=path)
+            self._published[fingerprint] = shared
+            return shared
+
+    def register(self, df, fingerprint, path):
+        """
+        Publica un DataFrame que ya está guardado como Arrow IPC (la copia columnar del
+        DatasetStore) sin volver a escribirlo. Ese fichero no se elimina al liberarlo.
+        """
+        set_dataset_fingerprint(df, fingerprint)
+        with self._lock:
+            self._published.setdefault(fingerprint, SharedDataset(fingerprint=fingerprint, path=path))
+
+    def release(self, fingerprint):
+        """Elimina el fichero publicado (los trabajadores que ya lo mapearon siguen funcionando)"""
+        with self._lock:
+            shared = self._published.pop(fingerprint, None)
+        if shared is not None and os.path.dirname(shared.path) == self.base_dir and os.path.exists(shared.path):
+            os.remove(shared.path)
+
+    def close(self):
+        with self._lock:
+            self._published.clear()
+        shutil.rmtree(self.base_dir, ignore_errors=True)
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_shared_store():
+    """Devuelve el almacén compartido por todo el proceso"""
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = SharedDatasetStore()
+            atexit.register(_store.close)
+        return _store
+
+
+_attached = OrderedDict()
+_MAX_ATTACHED = 2
+
+
+def attach_dataset(shared):
+    """
+    Lado del trabajador: mapea el dataset en memoria (solo lectura) y lo guarda
+    para los siguientes gráficos. Las columnas numéricas sin nulos no se copian.
+    Devuelve una copia superficial; con copy-on-write las escrituras del código
+    generado nunca modifican el dataset mapeado.
+    """
+    import pyarrow as pa
+
+    if shared.fingerprint not in _attached:
+        source = pa.memory_map(shared.path, "r")
+        table = pa.ipc.open_file(source).read_all()
+        _attached[shared.fingerprint] = table.to_pandas(split_blocks=True)
+        while len(_attached) > _MAX_ATTACHED:
+            _attached.popitem(last=False)
+    _attached.move_to_end(shared.fingerprint)
+
+    return _attached[shared.fingerprint].copy(deep=False)
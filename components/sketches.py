@@ -0,0 +1,132 @@
+import math
+
+import numpy as np
+import pandas as pd
+
+
+def hash_values(series):
+    """
+    Hash de 64 bits de cada valor no nulo de una serie (vectorizado).
+    Devuelve los hashes y los valores no nulos (sin convertir).
+    Las columnas numéricas se hashean como float64 para que 1 y 1.0 coincidan entre fragmentos.
+    """
+    values = series.dropna()
+    hashed_values = values
+    if pd.api.types.is_numeric_dtype(values) and not pd.api.types.is_bool_dtype(values):
+        hashed_values = values.astype("float64")
+    return pd.util.hash_pandas_object(hashed_values, index=False).to_numpy(dtype=np.uint64), values
+
+
+def _bit_length(values):
+    """Longitud en bits de enteros uint64 (exacta, por mitades de 32 bits)"""
+    high = (values >> np.uint64(32)).astype(np.float64)
+    low = (values & np.uint64(0xFFFFFFFF)).astype(np.float64)
+    _, high_bits = np.frexp(high)
+    _, low_bits = np.frexp(low)
+    return np.where(high > 0, high_bits + 32, low_bits)
+
+
+class HyperLogLog():
+    """
+    Estimador de valores distintos en memoria constante (2**precision registros).
+    Error estándar relativo ~ 1.04 / sqrt(2**precision).
+    """
+
+    def __init__(self, precision=14):
+        self.precision = precision
+        self.m = 1 << precision
+        self.registers = np.zeros(self.m, dtype=np.uint8)
+
+    def add_hashes(self, hashes):
+        if len(hashes) == 0:
+            return
+        p = np.uint64(self.precision)
+        index = (hashes >> (np.uint64(64) - p)).astype(np.int64)
+        # Bits restantes desplazados a la izquierda; el bit centinela limita el rango
+        remaining = (hashes << p) | (np.uint64(1) << (p - np.uint64(1)))
+        rank = (65 - _bit_length(remaining)).astype(np.uint8)
+        np.maximum.at(self.registers, index, rank)
+
+    def count(self):
+        alpha = 0.7213 / (1 + 1.079 / self.m)
+        estimate = alpha * self.m ** 2 / np.sum(np.power(2.0, -self.registers.astype(np.float64)))
+        zeros = int(np.count_nonzero(self.registers == 0))
+        if estimate <= 2.5 * self.m and zeros > 0:
+            # Corrección para cardinalidades pequeñas (linear counting)
+            estimate = self.m * math.log(self.m / zeros)
+        return estimate
+
+    @property
+    def relative_std_error(self):
+        return 1.04 / math.sqrt(self.m)
+
+
+class RunningMoments():
+    """
+    Media y desviación típica en streaming (Welford, combinando fragmentos con Chan),
+    además de mínimo y máximo exactos
+    """
+
+    def __init__(self):
+        self.count = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.min = None
+        self.max = None
+
+    def add(self, values):
+        values = np.asarray(values, dtype=np.float64)
+        values = values[~np.isnan(values)]
+        if len(values) == 0:
+            return
+        count = len(values)
+        mean = float(values.mean())
+        m2 = float(((values - mean) ** 2).sum())
+
+        total = self.count + count
+        delta = mean - self.mean
+        self.mean += delta * count / total
+        self.m2 += m2 + delta ** 2 * self.count * count / total
+        self.count = total
+
+        chunk_min, chunk_max = values.min(), values.max()
+        self.min = chunk_min if self.min is None else min(self.min, chunk_min)
+        self.max = chunk_max if self.max is None else max(self.max, chunk_max)
+
+    @property
+    def std(self):
+        # ddof=1, igual que pandas
+        return math.sqrt(self.m2 / (self.count - 1)) if self.count > 1 else float("nan")
+
+
+class DistinctReservoir():
+    """
+    Muestra uniforme de k valores distintos en una sola pasada: conserva los k valores
+    con el hash más pequeño (cada valor distinto tiene la misma probabilidad)
+    """
+
+    def __init__(self, k):
+        self.k = k
+        self.items = {}
+
+    def add(self, hashes, values):
+        if self.k == 0 or len(hashes) == 0:
+            return
+        # Hashes distintos ordenados de menor a mayor con la posición de su primera aparición
+        unique_hashes, positions = np.unique(hashes, return_index=True)
+        for value_hash, position in zip(unique_hashes[:self.k].tolist(), positions[:self.k]):
+            if value_hash in self.items:
+                continue
+            if len(self.items) < self.k:
+                self.items[value_hash] = values.iloc[position]
+            else:
+                largest = max(self.items)
+                if value_hash >= largest:
+                    break
+                del self.items[largest]
+                self.items[value_hash] = values.iloc[position]
+
+    def sample(self):
+        # Tipos de Python, igual que Series.tolist(), para que sean serializables con JSON
+        return [value.item() if isinstance(value, np.generic) else value
+                for value in (self.items[value_hash] for value_hash in sorted(self.items))]
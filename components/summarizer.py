@@ -1,7 +1,9 @@
 import json_repair
-import pandas as pd
-import warnings
-from . import component_utils, llm_utils, utils
+import os
+from . import component_utils, llm_utils, profiler, utils
+from .dataset_store import get_dataset_store
+from .remote_cache import resolve_dataset_location
+from .summary_cache import SummaryCache
 from pydantic import BaseModel
 from typing import List
 
@@ -23,105 +25,33 @@ class Summarizer():
         Convierte el valor al tipo correcto para asegurar que es serializable con JSON
         """
         
-        if "float" in str(dtype):
-            return float(value)
-            
-        elif "int" in str(dtype):
-            return int(value)
-            
-        else:
-            return value
+        return profiler.check_type(dtype, value)
 
-    def get_column_properties(self, df, n_samples=2):
+    def get_column_properties(self, df, n_samples=2, n_jobs=1):
         """
         Obtener las propiedades de cada columna en un DataFrame pandas
+        (ver profiler.profile_columns)
         """
         
-        properties_list = []
-        for column in df.columns:
-            dtype = df[column].dtype
-            properties = {}
-            
-            properties["na_count"] = (df[column].isna().sum()).item()
-            properties["non_na_count"] = len(df) - properties["na_count"]
-            
-            if dtype in [int, float, complex]:
-                properties["dtype"] = "number"
-                properties["mean"] = self.check_type(dtype, df[column].mean())
-                properties["std"] = self.check_type(dtype, df[column].std())
-                properties["min"] = self.check_type(dtype, df[column].min())
-                properties["max"] = self.check_type(dtype, df[column].max())
-
-            elif dtype == bool:
-                properties["dtype"] = "boolean"
-                
-            elif dtype == object:
-                # Comprueba si la columna de cadena se puede convertir en una fecha/hora válida
-                try:
-                    with warnings.catch_warnings():
-                        warnings.simplefilter("ignore")
-                        pd.to_datetime(df[column], errors='raise')
-                        properties["dtype"] = "date"
-                except ValueError:
-                    # Comprueba si la columna de strings tiene un número limitado de valores
-                    #if df[column].nunique() / len(df[column]) < 0.5:
-                    if df[column].nunique() < 10:
-                        properties["dtype"] = "category"
-                    else:
-                        properties["dtype"] = "string"
-                        
-            elif pd.api.types.is_categorical_dtype(df[column]):
-                properties["dtype"] = "category"
-                
-            elif pd.api.types.is_datetime64_any_dtype(df[column]):
-                properties["dtype"] = "date"
-                
-            else:
-                properties["dtype"] = str(dtype)
-
-            # añadir min max si dtype es fecha
-            if properties["dtype"] == "date":
-                try:
-                    properties["min"] = df[column].min()
-                    properties["max"] = df[column].max()
-                except TypeError:
-                    cast_date_col = pd.to_datetime(df[column], errors='coerce')
-                    properties["min"] = cast_date_col.min()
-                    properties["max"] = cast_date_col.max()
-
-            # Info de valores distintos
-            nunique = df[column].nunique()
-            properties["num_unique_values"] = nunique
-            
-            # Infor para ejemplos (samples)
-            non_null_values = df[column][df[column].notnull()].unique()
-            num_samples = min(n_samples, len(non_null_values))
-            if num_samples == 0:
-                samples = []
-            else:
-                samples = pd.Series(non_null_values).sample(num_samples, random_state=42).tolist()
-            properties["samples"] = samples
-            
-            properties_list.append(
-                {"column": column, 
-                 "properties": properties}
-            )
-
-        return properties_list
+        return profiler.profile_columns(df, n_samples=n_samples, n_jobs=n_jobs)
 
-    def enrich(self, base_summary, model, client):
+    def enrich(self, base_summary, model, client, temperature=1.0, use_cache=None,
+               max_tokens=component_utils.SUMMARY_TOKEN_BUDGET):
         """
         Enriquecer el resumen de datos con descripciones
+        max_tokens => presupuesto de tokens del resumen en el prompt
         """
         
         json_schema = DatasetAnnotation.model_json_schema()
         
         messages = [
             {"role": "system", "content": component_utils.get_summarizer_sys_prompt()},
-            {"role": "user", "content": component_utils.get_summarizer_user_prompt(base_summary)}
+            {"role": "user", "content": component_utils.get_summarizer_user_prompt(
+                component_utils.serialize_summary(base_summary, stage="summarizer", max_tokens=max_tokens))}
         ]
 
-        enriched_summary = llm_utils.get_llm_answer(client, model, messages, guided_json=json_schema)
+        enriched_summary = llm_utils.get_llm_answer(client, model, messages, guided_json=json_schema,
+                                                    temperature=temperature, use_cache=use_cache)
         
         try:
             return json_repair.repair_json(enriched_summary, ensure_ascii=False, return_objects=True)
@@ -135,20 +65,61 @@ class Summarizer():
                   client,
                   n_samples=2, 
                   summary_method="default", 
-                  encoding="utf-8"):
+                  encoding="utf-8",
+                  use_cache=True,
+                  approximate=False,
+                  chunksize=200_000,
+                  compact=False):
         """
         Resumir datos de un DataFrame de pandas o de una ubicación de archivo.
         summary_method => default, sin descripciones de llm
         summary_method => llm, con desc de llm
         summary_method => columns, sin llm, solo nombres de columnas
+        use_cache => reutilizar los resúmenes guardados en disco para el mismo fichero
+                     (junto a su copia columnar, ver DatasetStore)
+        approximate => si data es una ruta, perfilar el fichero por fragmentos de chunksize
+                       filas sin cargarlo entero (valores distintos aproximados). En ese caso
+                       se devuelve data=None y el resumen incluye las cotas de error
+        compact => reducir la memoria del DataFrame al cargarlo (tipos reducidos, category
+                   y cadenas de Arrow); el informe queda en data.attrs["compaction"]
         """
         
+        file_location = None
+        file_name = None
+        llm_summary = None
+        approximation = None
+
         # si los datos son una ruta de archivo, se leen en un pandas DataFrame, establecer file_name al nombre del archivo
         if isinstance(data, str):
+            # Las URLs se descargan una vez y se leen desde la copia local
+            file_location = resolve_dataset_location(data)
             file_name = data.split("/")[-1]
-            data = utils.read_dataframe(data, encoding=encoding)
-            
-        data_properties = self.get_column_properties(data, n_samples)
+            if approximate:
+                data_properties, approximation = profiler.profile_chunks(
+                    utils.iter_dataframe_chunks(file_location, encoding=encoding, chunksize=chunksize),
+                    n_samples=n_samples
+                )
+                data = None
+            elif os.path.isfile(file_location):
+                # Los ficheros locales se ingieren una vez y se leen de su copia columnar
+                data = get_dataset_store().load(file_location, encoding=encoding, compact=compact)
+            else:
+                data = utils.read_dataframe(file_location, encoding=encoding, compact=compact)
+        elif compact:
+            data, report = utils.compact_dataframe(data)
+            data.attrs["compaction"] = report
+
+        if approximation is None:
+            # Solo los ficheros locales se pueden identificar por contenido y mtime
+            dataset_store = get_dataset_store() if use_cache and file_location and os.path.isfile(file_location) else None
+
+            data_properties = None
+            if dataset_store:
+                data_properties = dataset_store.get_summary(file_location, encoding, n_samples, compact=compact)
+            if data_properties is None:
+                data_properties = self.get_column_properties(data, n_samples)
+                if dataset_store:
+                    dataset_store.set_summary(file_location, encoding, n_samples, data_properties, compact=compact)
 
         # construcción del resumen de una sola etapa por defecto (default)
         base_summary = {
@@ -159,11 +130,19 @@ class Summarizer():
 
         if summary_method == "llm":
             # resumen con enriquecimiento de llm
-            llm_summary = self.enrich(
-                base_summary,
-                config["dynamic_config"]["dynamic_model_name"],
-                client
-            )
+            model = config["dynamic_config"]["dynamic_model_name"]
+            if use_cache:
+                llm_summary = SummaryCache().get_enriched(base_summary, model)
+            if llm_summary is None:
+                llm_summary = self.enrich(
+                    base_summary,
+                    model,
+                    client,
+                    max_tokens=component_utils.get_summary_token_budget(config),
+                    **llm_utils.get_sampling_options(config)
+                )
+                if use_cache:
+                    SummaryCache().set_enriched(base_summary, model, llm_summary)
             
             # Unificar y agregar la información del llm en el primer resumen
             base_summary["llm_desc"] = llm_summary['dataset_description']
@@ -180,4 +159,7 @@ class Summarizer():
                     field['properties']['llm_description'] = "-"
                     field['properties']['llm_semantic_type'] = "-"
 
+        if approximation is not None:
+            base_summary["approximation"] = approximation
+
         return data, base_summary, llm_summary
\ No newline at end of file
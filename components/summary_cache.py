@@ -0,0 +1,63 @@
+import hashlib
+import json
+import os
+import pickle
+
+from .fileio import atomic_write
+
+
+def file_content_hash(file_location, block_size=1024 * 1024):
+    """
+    Hash SHA-256 del contenido de un fichero, leído por bloques
+    """
+    digest = hashlib.sha256()
+    with open(file_location, "rb") as file:
+        for block in iter(lambda: file.read(block_size), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def indexed_content_hash(file_location, index_dir):
+    """
+    Hash del contenido de un fichero con un índice por ruta + tamaño + mtime
+    que evita volver a leerlo entero si no ha cambiado
+    """
+    os.makedirs(index_dir, exist_ok=True)
+    stat = os.stat(file_location)
+    index_key = f"{os.path.abspath(file_location)}|{stat.st_size}|{stat.st_mtime_ns}"
+    index_path = os.path.join(index_dir, hashlib.sha256(index_key.encode("utf-8")).hexdigest() + ".json")
+    if os.path.exists(index_path):
+        with open(index_path, "r") as file:
+            return json.load(file)["content_hash"]
+
+    content_hash = file_content_hash(file_location)
+    atomic_write(index_path, json.dumps({"file": os.path.abspath(file_location),
+                                          "content_hash": content_hash}).encode("utf-8"))
+    return content_hash
+
+
+class SummaryCache():
+    """
+    Caché en disco de los resúmenes enriquecidos por el LLM, por resumen base y modelo.
+    El resumen base (propiedades de columnas) se guarda junto a la copia columnar
+    del dataset, ver dataset_store.DatasetStore.
+    """
+
+    def __init__(self, cache_dir=".cache/summaries"):
+        self.cache_dir = cache_dir
+        os.makedirs(os.path.join(cache_dir, "enriched"), exist_ok=True)
+
+    def _enriched_path(self, base_summary, model):
+        enriched_key = f"{repr(base_summary)}|{model}"
+        return os.path.join(self.cache_dir, "enriched", hashlib.sha256(enriched_key.encode("utf-8")).hexdigest() + ".pkl")
+
+    def get_enriched(self, base_summary, model):
+        """Anotaciones del LLM guardadas para el resumen base y el modelo, o None"""
+        enriched_path = self._enriched_path(base_summary, model)
+        if not os.path.exists(enriched_path):
+            return None
+        with open(enriched_path, "rb") as file:
+            return pickle.load(file)
+
+    def set_enriched(self, base_summary, model, llm_summary):
+        atomic_write(self._enriched_path(base_summary, model), pickle.dumps(llm_summary))
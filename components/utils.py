@@ -1,6 +1,12 @@
+import hashlib
+import json
+import json_repair
+import os
 import pandas as pd
 import yaml
 import re
+from .remote_cache import resolve_dataset_location
+from .fileio import atomic_write
 
 def load_config(config_path="config/config.yaml"):
     """
@@ -11,24 +17,187 @@ def load_config(config_path="config/config.yaml"):
 
     return config
 
-def read_dataframe(file_location, encoding='utf-8'):
+COLUMN_MAPPINGS_DIR = ".cache/column_mappings"
+
+
+def _source_columns(file_location, file_extension, encoding):
+    """
+    Nombres de columna originales del fichero sin leer los datos
+    (None si el formato no lo permite)
+    """
+    if file_extension in ['csv', 'tsv']:
+        sep = "\t" if file_extension == 'tsv' else ","
+        return pd.read_csv(file_location, sep=sep, encoding=encoding, nrows=0).columns.tolist()
+    elif file_extension == 'parquet':
+        import pyarrow.parquet as pq
+        return pq.read_schema(file_location).names
+    elif file_extension == 'feather':
+        import pyarrow as pa
+        return pa.ipc.open_file(pa.memory_map(file_location, "r")).schema.names
+    return None
+
+
+def _column_mapping_path(file_location, encoding):
+    stat = os.stat(file_location)
+    mapping_key = f"{os.path.abspath(file_location)}|{stat.st_size}|{stat.st_mtime_ns}|{encoding}"
+    return os.path.join(COLUMN_MAPPINGS_DIR, hashlib.sha256(mapping_key.encode("utf-8")).hexdigest() + ".json")
+
+
+def load_column_mapping(file_location, encoding='utf-8'):
+    """
+    Correspondencia nombre original -> nombre limpio guardada para el fichero
+    (se invalida si cambia su tamaño o mtime), o None
+    """
+    if not os.path.isfile(file_location):
+        return None
+    mapping_path = _column_mapping_path(file_location, encoding)
+    if not os.path.exists(mapping_path):
+        return None
+    with open(mapping_path, "r", encoding="utf-8") as file:
+        return {raw_name: clean_name for raw_name, clean_name in json.load(file)["columns"]}
+
+
+def save_column_mapping(file_location, encoding, mapping):
+    """
+    Guarda la correspondencia de nombres de columna en un fichero aparte
+    (el fichero de datos original nunca se modifica)
+    """
+    if not os.path.isfile(file_location):
+        return
+    os.makedirs(COLUMN_MAPPINGS_DIR, exist_ok=True)
+    payload = json.dumps({"file": os.path.abspath(file_location), "columns": list(mapping.items())}, ensure_ascii=False)
+    # Fichero temporal por hilo: varias sesiones del proceso pueden guardar el mismo mapeo a la vez
+    atomic_write(_column_mapping_path(file_location, encoding), payload.encode("utf-8"))
+
+
+def get_column_mapping(file_location, file_extension, encoding):
+    """
+    Correspondencia nombre original -> nombre limpio, desde el fichero de mapeo si
+    existe o leyendo solo la cabecera. None si el formato no permite leer la cabecera
+    (JSON y Excel), en cuyo caso se obtiene al leer los datos.
+    """
+    mapping = load_column_mapping(file_location, encoding)
+    if mapping is not None:
+        return mapping
+    source_columns = _source_columns(file_location, file_extension, encoding)
+    if source_columns is None:
+        return None
+    mapping = {column: clean_column_name(column) for column in source_columns}
+    save_column_mapping(file_location, encoding, mapping)
+    return mapping
+
+
+def _resolve_columns(mapping, usecols, dtype):
+    """
+    Traduce usecols y dtype (con nombres de columna limpios) a los nombres originales del fichero
+    """
+    if mapping is None:
+        return usecols, dtype
+    raw_names = {clean_name: raw_name for raw_name, clean_name in mapping.items()}
+    if usecols is not None:
+        # En el orden del fichero, igual que usecols en pd.read_csv
+        usecols = [raw_name for raw_name, clean_name in mapping.items() if clean_name in usecols]
+    if dtype is not None:
+        dtype = {raw_names[column]: column_dtype for column, column_dtype in dtype.items()
+                 if column in raw_names and (usecols is None or raw_names[column] in usecols)}
+    return usecols, dtype
+
+
+def _read_csv_pyarrow(file_location, sep, encoding, usecols=None, dtype=None):
+    """
+    Lectura multihilo de un CSV completo con pyarrow.csv, con el mismo resultado que pd.read_csv:
+    las fechas se dejan como texto, los textos vacíos como nulos, las cabeceras
+    repetidas se renombran como en pandas (a, a.1, ...) y las columnas sin ningún
+    valor son float64.
+    """
+    import pyarrow as pa
+    import pyarrow.csv as pa_csv
+
+    # La cabecera se lee con pandas para tener los mismos nombres (y el mismo mapeo de columnas)
+    column_names = pd.read_csv(file_location, sep=sep, encoding=encoding, nrows=0).columns.tolist()
+    read_options = pa_csv.ReadOptions(encoding=encoding, column_names=column_names, skip_rows=1)
+    parse_options = pa_csv.ParseOptions(delimiter=sep)
+    convert_options = pa_csv.ConvertOptions(strings_can_be_null=True, include_columns=usecols)
+
+    # El esquema inferido con el primer bloque indica qué columnas pyarrow convertiría a fecha
+    reader = pa_csv.open_csv(file_location, read_options=read_options, parse_options=parse_options,
+                             convert_options=convert_options)
+    schema = reader.schema
+    reader.close()
+
+    column_types = {
+        field.name: pa.string()
+        for field in schema
+        if pa.types.is_timestamp(field.type) or pa.types.is_date(field.type) or pa.types.is_time(field.type)
+    }
+    convert_options.column_types = column_types
+
+    table = pa_csv.read_csv(file_location, read_options=read_options, parse_options=parse_options,
+                            convert_options=convert_options)
+    df = table.to_pandas()
+    # pyarrow lee las columnas vacías como tipo null (object con None); pandas como float64 con NaN
+    null_columns = [field.name for field in table.schema if pa.types.is_null(field.type)]
+    if null_columns:
+        df = df.astype({column: "float64" for column in null_columns})
+    return df.astype(dtype) if dtype else df
+
+
+def _has_pyarrow():
+    try:
+        import pyarrow.csv  # noqa: F401
+        return True
+    except ImportError:
+        return False
+
+
+def read_dataframe(file_location, encoding='utf-8', usecols=None, dtype=None, chunksize=None, engine=None,
+                   compact=False):
     """
     Lee un dataframe de una ubicación de archivo dada y limpia los nombres de sus columnas.
     :param file_location: La ruta al fichero que contiene los datos.
     :param encoding: Codificación a utilizar para la lectura del fichero.
+    :param usecols: Lista de columnas (nombres limpios) a leer; el resto no se carga.
+    :param dtype: Diccionario columna (nombre limpio) -> dtype, ver get_summary_dtypes.
+    :param chunksize: Si se indica, devuelve un iterador de DataFrames de chunksize filas
+                      (ver iter_dataframe_chunks).
+    :param engine: Motor para CSV/TSV: "pyarrow", "c" o None (pyarrow si está instalado).
+    :param compact: Reducir la memoria del DataFrame (ver compact_dataframe); el informe
+                    queda en df.attrs["compaction"].
     :return: Un DataFrame limpio.
     """
-    
+
+    if chunksize is not None:
+        return iter_dataframe_chunks(file_location, encoding=encoding, chunksize=chunksize,
+                                     usecols=usecols, dtype=dtype)
+
+    file_location = resolve_dataset_location(file_location)
     file_extension = file_location.split('.')[-1]
+    if engine is None:
+        engine = "pyarrow" if _has_pyarrow() else "c"
+
+    mapping = None
+    if os.path.isfile(file_location) or usecols is not None or dtype is not None:
+        # En ficheros remotos la cabecera solo se lee aparte si hace falta para seleccionar columnas
+        mapping = get_column_mapping(file_location, file_extension, encoding)
+    raw_usecols, raw_dtype = _resolve_columns(mapping, usecols, dtype)
+
+    def read_csv(sep):
+        if engine == "pyarrow":
+            try:
+                return _read_csv_pyarrow(file_location, sep, encoding, usecols=raw_usecols, dtype=raw_dtype)
+            except Exception as e:
+                # Ficheros que pyarrow no sabe leer (p. ej. filas irregulares): se usa el motor de pandas
+                print(f"Lectura con pyarrow fallida, se usa pandas: {e}")
+        return pd.read_csv(file_location, sep=sep, encoding=encoding, usecols=raw_usecols, dtype=raw_dtype)
 
     read_funcs = {
         'json': lambda: pd.read_json(file_location, orient='records', encoding=encoding),
-        'csv': lambda: pd.read_csv(file_location, encoding=encoding),
-        'xls': lambda: pd.read_excel(file_location, encoding=encoding),
-        'xlsx': lambda: pd.read_excel(file_location, encoding=encoding),
-        'parquet': pd.read_parquet,
-        'feather': pd.read_feather,
-        'tsv': lambda: pd.read_csv(file_location, sep="\t", encoding=encoding)
+        'csv': lambda: read_csv(","),
+        'xls': lambda: pd.read_excel(file_location),
+        'xlsx': lambda: pd.read_excel(file_location),
+        'parquet': lambda: pd.read_parquet(file_location, columns=raw_usecols),
+        'feather': lambda: pd.read_feather(file_location, columns=raw_usecols),
+        'tsv': lambda: read_csv("\t")
     }
 
     if file_extension not in read_funcs:
@@ -36,44 +205,184 @@ def read_dataframe(file_location, encoding='utf-8'):
 
     try:
         df = read_funcs[file_extension]()
+    except (ValueError, TypeError) as e:
+        if not dtype:
+            print(f"Error al leer el archivo: {file_location}. Error: {e}")
+            raise
+        # El resumen puede no coincidir con el fichero (p. ej. nulos en una columna entera)
+        print(f"Los dtypes indicados no son válidos para {file_location}, se infieren al leer: {e}")
+        return read_dataframe(file_location, encoding=encoding, usecols=usecols, engine=engine, compact=compact)
     except Exception as e:
-        logger.error(f"Error al leer el archivo: {file_location}. Error: {e}")
+        print(f"Error al leer el archivo: {file_location}. Error: {e}")
         raise
-        
-    # Limpiar nombres de columna
-    cleaned_df = clean_column_names(df)
-
-    if cleaned_df.columns.tolist() != df.columns.tolist():
-        write_funcs = {
-            'csv': lambda: cleaned_df.to_csv(file_location, index=False, encoding=encoding),
-            'xls': lambda: cleaned_df.to_excel(file_location, index=False),
-            'xlsx': lambda: cleaned_df.to_excel(file_location, index=False),
-            'parquet': lambda: cleaned_df.to_parquet(file_location, index=False),
-            'feather': lambda: cleaned_df.to_feather(file_location, index=False),
-            'json': lambda: cleaned_df.to_json(file_location, orient='records', index=False, default_handler=str),
-            'tsv': lambda: cleaned_df.to_csv(file_location, index=False, sep='\t', encoding=encoding)
-        }
 
-        if file_extension not in write_funcs:
-            raise ValueError('Unsupported file type')
+    if file_extension in ['parquet', 'feather'] and raw_dtype:
+        df = df.astype(raw_dtype)
 
-        try:
-            write_funcs[file_extension]()
-        except Exception as e:
-            logger.error(f"Error al escribir el archivo: {file_location}. Error: {e}")
-            raise
+    # Limpiar nombres de columna (solo en memoria, el fichero original no se modifica)
+    if mapping is None:
+        mapping = {column: clean_column_name(column) for column in df.columns}
+        save_column_mapping(file_location, encoding, mapping)
+    cleaned_df = clean_column_names(df, mapping)
+
+    if file_extension in ['json', 'xls', 'xlsx']:
+        # JSON y Excel no permiten seleccionar columnas ni tipos al leer
+        if usecols is not None:
+            cleaned_df = cleaned_df[[column for column in cleaned_df.columns if column in usecols]]
+        if dtype:
+            cleaned_df = cleaned_df.astype({column: column_dtype for column, column_dtype in dtype.items()
+                                            if column in cleaned_df.columns})
+
+    if compact:
+        cleaned_df, report = compact_dataframe(cleaned_df)
+        cleaned_df.attrs["compaction"] = report
 
     return cleaned_df
 
-def clean_column_names(df: pd.DataFrame) -> pd.DataFrame:
+def iter_dataframe_chunks(file_location, encoding='utf-8', chunksize=200_000, usecols=None, dtype=None):
+    """
+    Lee un fichero por fragmentos sin cargarlo entero en memoria y limpia los nombres
+    de columna de cada fragmento.
+    CSV/TSV se leen con chunksize, parquet por row groups y feather mapeado en memoria.
+    JSON y Excel no admiten lectura parcial: se leen enteros y se devuelven por fragmentos.
+    :param file_location: La ruta al fichero que contiene los datos.
+    :param encoding: Codificación a utilizar para la lectura del fichero.
+    :param chunksize: Número de filas por fragmento.
+    :param usecols: Lista de columnas (nombres limpios) a leer.
+    :param dtype: Diccionario columna (nombre limpio) -> dtype.
+    :return: Un iterador de DataFrames.
+    """
+
+    file_location = resolve_dataset_location(file_location)
+    file_extension = file_location.split('.')[-1]
+    mapping = get_column_mapping(file_location, file_extension, encoding)
+    raw_usecols, raw_dtype = _resolve_columns(mapping, usecols, dtype)
+
+    if file_extension in ['csv', 'tsv']:
+        sep = "\t" if file_extension == 'tsv' else ","
+        chunks = pd.read_csv(file_location, sep=sep, encoding=encoding, chunksize=chunksize,
+                             usecols=raw_usecols, dtype=raw_dtype)
+    elif file_extension == 'parquet':
+        import pyarrow.parquet as pq
+        chunks = (batch.to_pandas()
+                  for batch in pq.ParquetFile(file_location).iter_batches(batch_size=chunksize, columns=raw_usecols))
+    elif file_extension == 'feather':
+        import pyarrow as pa
+        reader = pa.ipc.open_file(pa.memory_map(file_location, "r"))
+        chunks = (reader.get_batch(i).to_pandas() for i in range(reader.num_record_batches))
+        if raw_usecols is not None:
+            chunks = (chunk[raw_usecols] for chunk in chunks)
+    elif file_extension in ['json', 'xls', 'xlsx']:
+        df = read_dataframe(file_location, encoding=encoding, usecols=usecols, dtype=dtype)
+        chunks = (df.iloc[start:start + chunksize] for start in range(0, len(df), chunksize))
+    else:
+        raise ValueError('Unsupported file type')
+
+    for chunk in chunks:
+        if file_extension in ['parquet', 'feather'] and raw_dtype:
+            chunk = chunk.astype(raw_dtype)
+        yield clean_column_names(chunk, mapping)
+
+
+def compact_dataframe(df, max_category_ratio=0.5, arrow_strings=True):
+    """
+    Reduce la memoria de un DataFrame:
+    - enteros al tipo más pequeño en el que caben sus valores (int8, int16...)
+    - decimales a float32 solo si la conversión no pierde precisión
+    - texto con pocos valores distintos (distintos / filas < max_category_ratio) a category,
+      salvo las columnas de fechas, que se dejan como texto
+    - el resto del texto a cadenas de Arrow (string[pyarrow]) si arrow_strings
+    Devuelve el DataFrame compactado y un informe con la memoria ahorrada.
+    """
+    from .profiler import parse_datetime_column
+
+    memory_before = int(df.memory_usage(deep=True).sum())
+    conversions = {}
+    compacted = {}
+
+    for column in df.columns:
+        series = df[column]
+        dtype = series.dtype
+        new_series = series
+
+        if pd.api.types.is_integer_dtype(dtype) and dtype.kind in "iu":
+            new_series = pd.to_numeric(series, downcast="integer" if dtype.kind == "i" else "unsigned")
+        elif pd.api.types.is_float_dtype(dtype) and dtype == "float64":
+            as_float32 = series.astype("float32")
+            if ((as_float32.astype("float64") == series) | series.isna()).all():
+                new_series = as_float32
+        elif dtype == object and pd.api.types.infer_dtype(series, skipna=True) == "string":
+            uniques = series.dropna().unique()
+            if len(series) and len(uniques) / len(series) < max_category_ratio \
+                    and parse_datetime_column(pd.Series(uniques, dtype=object), na_count=0) is None:
+                new_series = series.astype("category")
+            elif arrow_strings:
+                try:
+                    new_series = series.astype("string[pyarrow]")
+                except ImportError:
+                    pass
+
+        if new_series.dtype != dtype:
+            compacted[column] = new_series
+            conversions[column] = f"{dtype} -> {new_series.dtype}"
+
+    if compacted:
+        df = df.copy(deep=False)
+        for column, new_series in compacted.items():
+            df[column] = new_series
+
+    memory_after = int(df.memory_usage(deep=True).sum())
+    report = {
+        "memory_before": memory_before,
+        "memory_after": memory_after,
+        "memory_saved": memory_before - memory_after,
+        "memory_saved_pct": round(100 * (memory_before - memory_after) / memory_before, 1) if memory_before else 0.0,
+        "conversions": conversions,
+    }
+    return df, report
+
+
+def get_summary_dtypes(summary):
+    """
+    Dtypes explícitos para leer el dataset a partir de su resumen, evitando la inferencia
+    de tipos al leer: números sin nulos con valores enteros -> int64, resto de números
+    -> float64, booleanos sin nulos -> bool y categorías -> category.
+    Las fechas y los textos se dejan como texto, igual que en la lectura normal.
+    """
+    dtypes = {}
+    for field in summary["fields"]:
+        properties = field["properties"]
+        if properties["dtype"] == "number":
+            is_integer = properties["na_count"] == 0 and isinstance(properties.get("min"), int)
+            dtypes[field["column"]] = "int64" if is_integer else "float64"
+        elif properties["dtype"] == "boolean" and properties["na_count"] == 0:
+            dtypes[field["column"]] = "bool"
+        elif properties["dtype"] == "category":
+            dtypes[field["column"]] = "category"
+    return dtypes
+
+
+def get_code_columns(code, columns):
+    """
+    Columnas del dataset que aparecen como literales de texto en el código de un gráfico
+    """
+    literals = set(re.findall(r"""["']([^"'\n]+)["']""", code))
+    return [column for column in columns if column in literals]
+
+
+def clean_column_names(df: pd.DataFrame, mapping=None) -> pd.DataFrame:
     """
     Limpia todos los nombres de columna del DataFrame dado.
     param df: El DataFrame con nombres de columnas posiblemente sucios.
-    :return: Una copia del DataFrame con los nombres de las columnas limpios.
+    param mapping: Correspondencia nombre original -> nombre limpio ya conocida (opcional).
+    :return: Una copia superficial del DataFrame (comparte los datos) con los nombres de las columnas limpios.
     """
     
-    cleaned_df = df.copy()
-    cleaned_df.columns = [clean_column_name(col) for col in cleaned_df.columns]
+    cleaned_df = df.copy(deep=False)
+    if mapping is None:
+        cleaned_df.columns = [clean_column_name(col) for col in cleaned_df.columns]
+    else:
+        cleaned_df.columns = [mapping.get(col, clean_column_name(col)) for col in cleaned_df.columns]
     return cleaned_df
 
 def clean_column_name(col_name: str) -> str:
@@ -136,3 +445,87 @@ def clean_code_snippet(code_string):
     # cleaned_snippet = re.sub(r'[\x00-\x1F]+', ' ', cleaned_snippet)
 
     return cleaned_snippet
+
+
+class IncrementalJsonArrayParser():
+    """
+    Extrae los elementos del array `key` de un JSON que llega por fragmentos
+    (respuestas en streaming con guided_json). Cada elemento se devuelve en
+    cuanto se cierra, sin esperar al resto de la respuesta.
+    """
+
+    def __init__(self, key):
+        self.key = key
+        self.buffer = ""
+        self.position = None  # posición tras el '[' del array, cuando se encuentra
+        self.depth = 0
+        self.in_string = False
+        self.escape = False
+        self.item_start = None
+        self.done = False
+
+    def _find_array_start(self):
+        match = re.search(r'"' + re.escape(self.key) + r'"\s*:\s*\[', self.buffer)
+        if match:
+            self.position = match.end()
+
+    def feed(self, text):
+        """
+        Añade texto nuevo y devuelve la lista de elementos completados con él
+        """
+        self.buffer += text
+        if self.done:
+            return []
+        if self.position is None:
+            self._find_array_start()
+            if self.position is None:
+                return []
+
+        items = []
+        while self.position < len(self.buffer):
+            char = self.buffer[self.position]
+
+            if self.in_string:
+                if self.escape:
+                    self.escape = False
+                elif char == "\\":
+                    self.escape = True
+                elif char == '"':
+                    self.in_string = False
+            elif char == '"':
+                self.in_string = True
+            elif char in "{[":
+                if self.depth == 0:
+                    self.item_start = self.position
+                self.depth += 1
+            elif char in "}]":
+                if self.depth == 0:
+                    # Fin del array
+                    self.done = True
+                    break
+                self.depth -= 1
+                if self.depth == 0:
+                    item_text = self.buffer[self.item_start:self.position + 1]
+                    try:
+                        items.append(json.loads(item_text))
+                    except ValueError:
+                        items.append(json_repair.repair_json(item_text, ensure_ascii=False, return_objects=True))
+                    self.item_start = None
+
+            self.position += 1
+
+        return items
+
+
+def get_json_items_callback(key, on_item):
+    """
+    Crea un callback on_partial (texto acumulado) que llama a on_item con cada
+    elemento completo del array `key` según va llegando
+    """
+    parser = IncrementalJsonArrayParser(key)
+
+    def on_partial(text):
+        for item in parser.feed(text[len(parser.buffer):]):
+            on_item(item)
+
+    return on_partial
@@ -13,22 +13,29 @@ class VizEditor():
         instruction,
         config, 
         client, 
-        library="seaborn"
+        library="seaborn",
+        on_partial=None
     ):
-        """Edit a code spec based on instructions"""
-        
-        messages = [
-            {"role": "system", "content": component_utils.get_viz_editor_sys_prompt(summary,
-                                                                                    lib=library)},
-            
-            {"role": "user", "content": component_utils.get_viz_editor_user_prompt(code, 
-                                                                                   instruction)}
-        ]
+        """
+        Edit a code spec based on instructions.
+        on_partial => callback que recibe el código parcial mientras se genera (streaming)
+        """
+
+        # Prefijo compartido con el generador y el reparador; si el resumen no cabe
+        # entero, las columnas del código y la instrucción se detallan aparte
+        messages = component_utils.build_viz_messages(summary,
+                                                      component_utils.get_viz_editor_user_prompt(code,
+                                                                                                 instruction),
+                                                      config,
+                                                      context=f"{code}\n{instruction}",
+                                                      lib=library)
         
         llm_edited_code = llm_utils.get_llm_answer(client, 
                                                    config["dynamic_config"]["dynamic_model_name"], 
                                                    messages, 
                                                    #guided_json=json_schema
+                                                   on_partial=on_partial,
+                                                   **llm_utils.get_sampling_options(config)
                                                   )
 
         return llm_edited_code
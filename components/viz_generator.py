@@ -14,10 +14,16 @@ class VizGenerator():
                  in_goals, 
                  config, 
                  client, 
-                 library="seaborn"):
-        """Generate visualization code given a summary and a goal"""
+                 library="seaborn",
+                 on_partial=None):
+        """
+        Generate visualization code given a summary and a goal.
+        on_partial => callback que recibe el código parcial mientras se genera (streaming).
+        En streaming los objetivos se generan de uno en uno.
+        """
 
         goals = copy.deepcopy(in_goals)
+        messages_list = []
         for goal in goals["goals"]:
             #print(goal["question"])
             #print(goal["visualization"])
@@ -26,17 +32,37 @@ class VizGenerator():
                                                                           goal["visualization"],
                                                                           library)
 
-            messages = [
-                {"role": "system", "content": component_utils.get_viz_generator_sys_prompt(summary, lang="spanish")},
-                {"role": "user", "content": component_utils.get_viz_generator_user_prompt(library_instructions, library_template)}
+            # Mismo prefijo (rol y resumen) para todos los objetivos; si el resumen no
+            # cabe entero, las columnas relacionadas con el objetivo se detallan aparte
+            messages = component_utils.build_viz_messages(
+                summary,
+                component_utils.get_viz_generator_user_prompt(library_instructions, library_template),
+                config,
+                context=" ".join([goal["question"], goal["visualization"], goal.get("rationale", "")]),
+                lib=library,
+                lang="spanish"
+            )
+            messages_list.append(messages)
+
+        if on_partial is not None:
+            llm_code_strings = [
+                llm_utils.get_llm_answer(client,
+                                         config["dynamic_config"]["dynamic_model_name"],
+                                         goal_messages,
+                                         on_partial=on_partial,
+                                         **llm_utils.get_sampling_options(config))
+                for goal_messages in messages_list
             ]
-            
-            llm_code_string = llm_utils.get_llm_answer(client, 
-                                                       config["dynamic_config"]["dynamic_model_name"], 
-                                                       messages, 
-                                                       #guided_json=json_schema
-                                                      )
-            
+        else:
+            # Las peticiones de todos los objetivos se lanzan a la vez
+            llm_code_strings = llm_utils.get_llm_answers(client, 
+                                                         config["dynamic_config"]["dynamic_model_name"], 
+                                                         messages_list, 
+                                                         #guided_json=json_schema
+                                                         **llm_utils.get_sampling_options(config)
+                                                        )
+
+        for goal, llm_code_string in zip(goals["goals"], llm_code_strings):
             goal["code"] = llm_code_string
 
         return goals, messages
@@ -16,26 +16,32 @@ class VizRepairer():
         error_trace,
         config,
         client,
-        library="seaborn"):
-        """Fix a code spec based on error message"""
+        library="seaborn",
+        on_partial=None):
+        """
+        Fix a code spec based on error message.
+        on_partial => callback que recibe el código parcial mientras se genera (streaming)
+        """
 
         #goals_with_bad_code = copy.deepcopy(in_goals_with_bad_code)
         #for goal in goals_with_bad_code["goals"]:
 
-        messages = [
-            {"role": "system", "content": component_utils.get_viz_repairer_sys_prompt(summary, 
-                                                                                      lib="seaborn")},
-
-            {"role": "user", "content": component_utils.get_viz_repairer_user_prompt(code, 
-                                                                                     error_msg,
-                                                                                     error_trace
-                                                                                    )}
-        ]
+        # Prefijo compartido con el generador y el editor; si el resumen no cabe
+        # entero, las columnas del código y del error se detallan aparte
+        messages = component_utils.build_viz_messages(summary,
+                                                      component_utils.get_viz_repairer_user_prompt(code,
+                                                                                                   error_msg,
+                                                                                                   error_trace),
+                                                      config,
+                                                      context=f"{code}\n{error_msg}",
+                                                      lib=library)
         
         llm_repaired_code = llm_utils.get_llm_answer(client, 
                                                      config["dynamic_config"]["dynamic_model_name"], 
                                                      messages, 
                                                      #guided_json=json_schema
+                                                     on_partial=on_partial,
+                                                     **llm_utils.get_sampling_options(config)
                                                     )
 
             #goal["code"] = llm_repaired_code
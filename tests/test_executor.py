@@ -0,0 +1,93 @@
+import pandas as pd
+import pytest
+
+from components import executor
+from components.executor import ChartExecutor, RenderOptions
+from components.shared_data import dataset_fingerprint
+
+MUTATING_CODE = """import matplotlib.pyplot as plt
+def plot(data):
+    data['a'] = 999
+    data.loc[0, 'b'] = -1
+    data['extra'] = data['b'] * 2
+    plt.plot(data['a'], data['b'])
+    return plt
+chart = plot(data)"""
+
+
+def _goals(code):
+    return {"goals": [{"index": 0, "question": "q", "visualization": "v", "rationale": "r", "code": code}]}
+
+
+@pytest.mark.parametrize("copy_on_write", [True, False])
+def test_thread_backend_does_not_modify_caller_frame(copy_on_write):
+    with pd.option_context("mode.copy_on_write", copy_on_write):
+        data = pd.DataFrame({"a": [1, 2, 3], "b": [4.0, 5.0, 6.0]})
+        expected = data.copy(deep=True)
+        fingerprint = dataset_fingerprint(data)
+
+        charts = ChartExecutor(backend="thread", use_cache=False).execute(
+            data, None, _goals(MUTATING_CODE), library="matplotlib",
+            render_options=RenderOptions(format="png", dpi=50),
+        )
+
+        assert charts[0].status, charts[0].error
+        pd.testing.assert_frame_equal(data, expected)
+        assert dataset_fingerprint(data) == fingerprint
+
+
+class _FailingChartCache():
+    def get(self, key):
+        return None
+
+    def set(self, key, raster):
+        raise OSError(28, "No space left on device")
+
+
+def test_chart_cache_write_failure_keeps_rendered_chart(monkeypatch):
+    monkeypatch.setattr(executor, "get_chart_cache", lambda: _FailingChartCache())
+    data = pd.DataFrame({"a": [1, 2, 3], "b": [4.0, 5.0, 6.0]})
+    code = ("import matplotlib.pyplot as plt\ndef plot(data):\n    plt.plot(data['a'], data['b'])\n"
+            "    return plt\nchart = plot(data)")
+
+    charts = ChartExecutor(backend="thread", use_cache=True).execute(
+        data, None, _goals(code), library="matplotlib", render_options=RenderOptions(format="png", dpi=50),
+    )
+
+    assert charts[0].status, charts[0].error
+    assert charts[0].raster
+
+
+SUMMARY = {"fields": [{"column": "a", "properties": {}}, {"column": "b", "properties": {}}]}
+
+
+@pytest.mark.parametrize("code", [
+    "import seaborn as sns\ndef plot(data):\n    data = data.melt(id_vars=['a'])\n"
+    "    sns.barplot(x=data['variable'], y=data['value'])\n    return sns\nchart = plot(data)",
+    "import matplotlib.pyplot as plt\ndef plot(data):\n    data = data.reset_index()\n"
+    "    plt.plot(data['index'], data['b'])\n    return plt\nchart = plot(data)",
+    "import matplotlib.pyplot as plt\ndef plot(data):\n    data = data.assign(**{'b2': data['b'] * 2})\n"
+    "    plt.plot(data['a'], data['b2'])\n    return plt\nchart = plot(data)",
+])
+def test_runtime_columns_do_not_block_execution(code):
+    data = pd.DataFrame({"a": [1, 2, 3], "b": [4.0, 5.0, 6.0]})
+
+    charts = ChartExecutor(backend="thread", use_cache=False).execute(
+        data, SUMMARY, _goals(code), library="seaborn", render_options=RenderOptions(format="png", dpi=50),
+    )
+
+    assert charts[0].status, charts[0].error
+
+
+def test_unknown_column_warning_is_added_to_the_error():
+    data = pd.DataFrame({"a": [1, 2, 3], "b": [4.0, 5.0, 6.0]})
+    code = ("import matplotlib.pyplot as plt\ndef plot(data):\n    plt.plot(data['a'], data['bb'])\n"
+            "    return plt\nchart = plot(data)")
+
+    charts = ChartExecutor(backend="thread", use_cache=False).execute(
+        data, SUMMARY, _goals(code), library="matplotlib", render_options=RenderOptions(format="png", dpi=50),
+    )
+
+    assert not charts[0].status
+    assert "La columna 'bb' no existe" in charts[0].error["message"]
+    assert [diagnostic["check"] for diagnostic in charts[0].error["diagnostics"]] == ["unknown_column"]
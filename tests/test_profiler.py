@@ -0,0 +1,29 @@
+import numpy as np
+import pandas as pd
+
+from components.profiler import profile_chunks
+
+
+def _chunks(df, chunksize):
+    return (df.iloc[start:start + chunksize] for start in range(0, len(df), chunksize))
+
+
+def test_unique_estimate_is_clamped_to_non_na_count():
+    n_rows = 50_000
+    df = pd.DataFrame({
+        "v": np.arange(n_rows),
+        "s": [f"id-{i}" for i in range(n_rows)],
+        "low": np.arange(n_rows) % 7,
+    })
+    df.loc[::10, "s"] = None
+
+    properties_list, approximation = profile_chunks(_chunks(df, 7_000))
+
+    intervals = approximation["num_unique_values"]["confidence_interval_95"]
+    for entry in properties_list:
+        properties = entry["properties"]
+        estimate = properties["num_unique_values"]
+        lower, upper = intervals[entry["column"]]
+        assert 0 <= estimate <= properties["non_na_count"]
+        assert lower <= estimate <= upper
+        assert upper <= properties["non_na_count"]
@@ -0,0 +1,56 @@
+import pandas as pd
+import pytest
+
+from components import utils
+from components.profiler import profile_columns
+
+pytest.importorskip("pyarrow.csv")
+
+CSV = (
+    "id,name,id,empty,id.1,when,amount\n"
+    "1,ana,10,,100,2024-01-05,1.5\n"
+    "2,,20,,200,2024-02-10,\n"
+    "3,luis,30,,300,2024-03-15,3.25\n"
+)
+
+
+@pytest.fixture(autouse=True)
+def column_mappings_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(utils, "COLUMN_MAPPINGS_DIR", str(tmp_path / "column_mappings"))
+
+
+@pytest.fixture
+def csv_path(tmp_path):
+    path = tmp_path / "edge_cases.csv"
+    path.write_text(CSV, encoding="utf-8")
+    return str(path)
+
+
+def _with_none(df):
+    # pyarrow deja None en los textos vacíos y pandas NaN: se comparan como el mismo nulo
+    return df.astype(object).where(df.notna(), None)
+
+
+def _profile_dtypes(df):
+    return {entry["column"]: entry["properties"]["dtype"] for entry in profile_columns(df)}
+
+
+def test_pyarrow_matches_pandas_engine(csv_path):
+    pandas_df = utils.read_dataframe(csv_path, engine="c")
+    pyarrow_df = utils.read_dataframe(csv_path, engine="pyarrow")
+
+    assert list(pyarrow_df.columns) == list(pandas_df.columns)
+    assert pyarrow_df.dtypes.to_dict() == pandas_df.dtypes.to_dict()
+    assert pyarrow_df["empty"].dtype == "float64"
+    pd.testing.assert_frame_equal(_with_none(pyarrow_df), _with_none(pandas_df))
+    assert _profile_dtypes(pyarrow_df) == _profile_dtypes(pandas_df)
+
+
+def test_pyarrow_selects_renamed_duplicate_columns(csv_path):
+    pandas_df = utils.read_dataframe(csv_path, engine="c")
+    columns = list(pandas_df.columns)[2:5]
+
+    pyarrow_df = utils.read_dataframe(csv_path, engine="pyarrow", usecols=columns)
+
+    assert list(pyarrow_df.columns) == columns
+    pd.testing.assert_frame_equal(_with_none(pyarrow_df), _with_none(pandas_df[columns]))
@@ -0,0 +1,150 @@
+import hashlib
+import os
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import httpx
+import pytest
+
+from components.remote_cache import RemoteDatasetCache
+
+
+class _DatasetHandler(BaseHTTPRequestHandler):
+    """Sirve server.content con ETag y responde 304 si el cliente ya lo tiene"""
+
+    def do_GET(self):
+        server = self.server
+        server.requests.append(dict(self.headers))
+        etag = '"' + hashlib.sha256(server.content).hexdigest()[:16] + '"'
+        if server.use_etag and self.headers.get("If-None-Match") == etag:
+            self.send_response(304)
+            self.end_headers()
+            return
+        self.send_response(200)
+        self.send_header("Content-Type", "text/csv")
+        self.send_header("Content-Length", str(len(server.content)))
+        if server.use_etag:
+            self.send_header("ETag", etag)
+        self.end_headers()
+        self.wfile.write(server.content)
+
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture
+def server():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _DatasetHandler)
+    server.content = b"a,b\n1,2\n"
+    server.use_etag = True
+    server.requests = []
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    server.url = f"http://127.0.0.1:{server.server_address[1]}/data/cars.csv"
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def _read(path):
+    with open(path, "rb") as file:
+        return file.read()
+
+
+def test_first_fetch_downloads(server, tmp_path):
+    cache = RemoteDatasetCache(cache_dir=str(tmp_path))
+
+    path = cache.fetch(server.url)
+
+    assert path.endswith("cars.csv")
+    assert _read(path) == server.content
+    assert len(server.requests) == 1
+
+
+def test_fresh_entry_is_served_without_requests(server, tmp_path):
+    cache = RemoteDatasetCache(cache_dir=str(tmp_path))
+    first = cache.fetch(server.url)
+
+    assert cache.fetch(server.url) == first
+    assert len(server.requests) == 1
+
+
+def test_revalidation_304_reuses_cached_copy(server, tmp_path):
+    cache = RemoteDatasetCache(cache_dir=str(tmp_path), max_age_seconds=0)
+    path = cache.fetch(server.url)
+    mtime = os.stat(path).st_mtime_ns
+
+    assert cache.fetch(server.url) == path
+    assert len(server.requests) == 2
+    assert server.requests[1].get("If-None-Match") is not None
+    assert _read(path) == server.content
+    assert os.stat(path).st_mtime_ns == mtime
+
+
+def test_same_content_without_etag_keeps_file(server, tmp_path):
+    server.use_etag = False
+    cache = RemoteDatasetCache(cache_dir=str(tmp_path), max_age_seconds=0)
+    path = cache.fetch(server.url)
+    mtime = os.stat(path).st_mtime_ns
+
+    assert cache.fetch(server.url) == path
+    assert len(server.requests) == 2
+    assert os.stat(path).st_mtime_ns == mtime
+
+
+def test_changed_content_is_downloaded_again(server, tmp_path):
+    cache = RemoteDatasetCache(cache_dir=str(tmp_path), max_age_seconds=0)
+    path = cache.fetch(server.url)
+
+    server.content = b"a,b\n3,4\n5,6\n"
+
+    assert cache.fetch(server.url) == path
+    assert _read(path) == server.content
+
+
+def test_unreachable_server_falls_back_to_cached_copy(server, tmp_path):
+    cache = RemoteDatasetCache(cache_dir=str(tmp_path), max_age_seconds=0, timeout_seconds=2)
+    path = cache.fetch(server.url)
+    content = server.content
+
+    server.shutdown()
+    server.server_close()
+
+    assert cache.fetch(server.url) == path
+    assert _read(path) == content
+
+
+def test_unreachable_server_without_copy_raises(server, tmp_path):
+    cache = RemoteDatasetCache(cache_dir=str(tmp_path), timeout_seconds=2)
+    url = server.url
+
+    server.shutdown()
+    server.server_close()
+
+    with pytest.raises(httpx.HTTPError):
+        cache.fetch(url)
+
+
+def test_offline_hit_serves_cached_copy(server, tmp_path):
+    cache = RemoteDatasetCache(cache_dir=str(tmp_path), max_age_seconds=0)
+    path = cache.fetch(server.url)
+
+    assert cache.fetch(server.url, offline=True) == path
+    assert len(server.requests) == 1
+
+
+def test_offline_miss_raises(server, tmp_path):
+    cache = RemoteDatasetCache(cache_dir=str(tmp_path), offline=True)
+
+    with pytest.raises(FileNotFoundError):
+        cache.fetch(server.url)
+    assert server.requests == []
+
+
+def test_offline_argument_overrides_cache_default(server, tmp_path):
+    cache = RemoteDatasetCache(cache_dir=str(tmp_path), offline=True)
+
+    path = cache.fetch(server.url, offline=False)
+
+    assert _read(path) == server.content
+    assert cache.offline is True
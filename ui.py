@@ -1,17 +1,24 @@
 import streamlit as st
+import hashlib
+import httpx
 import os
 import pandas as pd
-from components import component_utils, llm_utils, utils
+from components import component_utils, fileio, llm_cache, llm_utils, remote_cache, resources, summary_cache, utils
+from components.chart_cache import get_chart_cache
+from components.dataset_registry import get_dataset_registry
+from components.dataset_store import get_dataset_store
+from components.prefix_tracker import get_prefix_tracker
 from components.summarizer import Summarizer
 from components.persona import PersonaExplorer
 from components.goal import GoalExplorer
 from components.viz_generator import VizGenerator
-from components.executor import ChartExecutor
+from components.executor import EXPORT_RENDER_OPTIONS, PREVIEW_RENDER_OPTIONS, ChartExecutor
 from components.viz_repairer import VizRepairer
 from components.viz_editor import VizEditor
-from PIL import Image
-import io
-import base64
+
+# Los datasets se comparten entre sesiones (ver DatasetRegistry): con copy-on-write
+# las modificaciones de una sesión nunca alteran los datos de las demás
+pd.set_option("mode.copy_on_write", True)
 
 # Configuración inicial
 st.set_page_config(
@@ -21,16 +28,10 @@ st.set_page_config(
 )
 
 import streamlit as st
-import base64
-
-# Función para convertir imagen a base64
-def get_base64_image(file_path):
-    with open(file_path, "rb") as image_file:
-        return base64.b64encode(image_file.read()).decode()
 
-# Ruta de tu logo
+# Ruta de tu logo (se codifica una sola vez por proceso)
 logo_path = "images/logo.png"
-logo_base64 = get_base64_image(logo_path)
+logo_base64 = resources.get_file_base64(logo_path)
 
 # Contenedor con fondo azul y logo
 with st.container():
@@ -44,8 +45,11 @@ with st.container():
 st.write("# Generación automática de visualizaciones utilizando LLMs 📊")
 st.sidebar.write("# Configuración")
 
-# Cargar configuración y cliente LLM
-my_config = utils.load_config()
+# Cargar configuración y cliente LLM (compartidos por todo el proceso, se recargan si cambia el yaml)
+my_config = resources.get_config()
+get_dataset_registry().max_bytes = my_config.get("dataset_registry", {}).get("max_memory_mb", 2048) * 1024 ** 2
+get_chart_cache().max_bytes = my_config.get("chart_cache", {}).get("max_memory_mb", 128) * 1024 ** 2
+get_chart_cache().cache_dir = my_config.get("chart_cache", {}).get("cache_dir") or None
 
 st.markdown(
     """
@@ -53,6 +57,38 @@ Este servicio de Inteligencia Artificial transforma conjuntos de datos en visual
     """
 )
 
+def get_chart_data(goals_with_code):
+    """
+    DataFrame para ejecutar el código de los gráficos. Con el resumen aproximado el
+    dataset no se carga entero: solo se leen las columnas que usa el código, con los
+    dtypes del resumen, y se amplían si un gráfico posterior necesita otras.
+    """
+    if st.session_state.data_columns is None:
+        return st.session_state.data
+
+    columns = [field["column"] for field in st.session_state.llm_summ["fields"]]
+    needed_columns = []
+    for goal in goals_with_code["goals"]:
+        needed_columns += utils.get_code_columns(goal["code"], columns)
+    # Si el código no nombra columnas se carga el dataset completo
+    usecols = [column for column in columns if column in needed_columns or column in st.session_state.data_columns] if needed_columns else None
+
+    if st.session_state.data is None or usecols is None or len(usecols) > len(st.session_state.data_columns):
+        with st.spinner("Por favor espere... Cargando el dataset..."):
+            data = utils.read_dataframe(
+                st.session_state.data_location,
+                encoding=st.session_state.data_encoding,
+                usecols=usecols,
+                dtype=utils.get_summary_dtypes(st.session_state.llm_summ),
+                compact=st.session_state.data_compact
+            )
+        if st.session_state.data is not None:
+            ChartExecutor().release_dataset(st.session_state.data)
+        st.session_state.data = data
+        st.session_state.data_columns = None if usecols is None else usecols
+
+    return st.session_state.data
+
 # Inicializar session_state para todas las variables clave
 if "llm_summ" not in st.session_state:
     st.session_state.llm_summ = None
@@ -60,6 +96,11 @@ if "selected_persona" not in st.session_state:
     st.session_state.selected_persona = None
 if "data" not in st.session_state:
     st.session_state.data = None
+if "data_location" not in st.session_state:
+    st.session_state.data_location = None
+    st.session_state.data_encoding = None
+    st.session_state.data_columns = None
+    st.session_state.data_compact = False
 if "dataset_selectbox_enabled" not in st.session_state:
     st.session_state.dataset_selectbox_enabled = False # True
 if "dataset_selectbox_index" not in st.session_state:
@@ -110,6 +151,19 @@ if my_config:
             max_value=1.0,
             value=1.0
         )
+        my_config["dynamic_config"]["temperature"] = temperature
+
+        use_llm_cache = st.checkbox(
+            "Reutilizar respuestas en caché también con temperatura > 0",
+            value=False
+        )
+        # Con temperatura 0 la caché se usa siempre
+        my_config["dynamic_config"]["use_llm_cache"] = True if use_llm_cache else None
+        llm_cache_stats = llm_cache.get_llm_cache().stats()
+        st.caption(f"Caché LLM: {llm_cache_stats['hits']} aciertos, {llm_cache_stats['misses']} fallos, {llm_cache_stats['entries']} respuestas guardadas")
+        prefix_stats = get_prefix_tracker().stats()
+        if prefix_stats["requests"]:
+            st.caption(f"Prefijo reutilizado: {prefix_stats['reuse_ratio']:.0%} de ~{prefix_stats['prompt_tokens']} tokens de prompt en {prefix_stats['requests']} peticiones")
         
         st.write("### Librería Visualización")
         visualization_libraries = ["seaborn"]
@@ -138,6 +192,12 @@ if my_config:
         disabled=st.session_state.dataset_selectbox_enabled,
     )
 
+    # Los datasets remotos se descargan una vez; sin conexión solo se usan las copias locales
+    offline_datasets = st.sidebar.checkbox(
+        "Modo sin conexión (solo datasets ya descargados)",
+        value=my_config.get("dataset_cache", {}).get("offline", False)
+    )
+
     upload_own_data = st.sidebar.checkbox("Sube tus datos", value=False, key="dataset_selectbox_enabled")
     selected_dataset = None
     selected_dataset_enc = None
@@ -146,9 +206,16 @@ if my_config:
         uploaded_file = st.sidebar.file_uploader("Selecciona un archivo CSV", type=["csv"])
         if uploaded_file is not None:
             uploaded_file_path = os.path.join("data", uploaded_file.name)
-            data = pd.read_csv(uploaded_file, encoding="utf-8")
-            data.to_csv(uploaded_file_path, index=False)
+            # Se guardan los bytes tal cual y se ingiere una sola vez en formato columnar.
+            # Solo se reescribe si el contenido cambia (mismo nombre y tamaño no basta),
+            # así el mtime y las cachés del fichero se conservan entre reejecuciones
+            uploaded_bytes = uploaded_file.getbuffer()
+            if (not os.path.exists(uploaded_file_path)
+                    or summary_cache.file_content_hash(uploaded_file_path) != hashlib.sha256(uploaded_bytes).hexdigest()):
+                fileio.atomic_write(uploaded_file_path, uploaded_bytes)
+            get_dataset_store().ingest(uploaded_file_path, encoding="utf-8")
             selected_dataset = uploaded_file_path
+            selected_dataset_enc = "utf-8"
             datasets.append({"label": uploaded_file.name, "url": uploaded_file_path, "encoding": "utf-8"})
     else:
         selected_dataset = datasets[[dataset["label"] for dataset in datasets].index(selected_dataset_label)]["url"]
@@ -174,14 +241,34 @@ if my_config:
     selected_summary_method_description = summarization_methods[[method["label"] for method in summarization_methods].index(selected_method_label)]["description"]
     st.sidebar.markdown(f"<p>{selected_summary_method_description}</p>", unsafe_allow_html=True)
 
+    # Para ficheros grandes: resumen por fragmentos, el dataset se carga al generar la visualización
+    approximate_summary = st.sidebar.checkbox("Resumen aproximado (datasets grandes)", value=False)
+    # Tipos reducidos, category y cadenas de Arrow: menos memoria por sesión y groupby más rápidos
+    compact_data = st.sidebar.checkbox("Compactar el dataset en memoria", value=False)
+
     gen_df_summ_button = st.sidebar.button("Generar Resumen")
 
     # Generar resumen
     if gen_df_summ_button and my_config and selected_dataset and selected_method and selected_model:
         summ = Summarizer()
         with st.spinner("Por favor espere... Generando resumen de datos"):
-            data, llm_summ, _ = summ.summarize(selected_dataset, my_config, my_client, encoding=selected_dataset_enc, summary_method=selected_method)
+            # El modo sin conexión es de esta sesión: la URL se resuelve aquí a la copia local
+            # y el resto de etapas leen esa ruta sin volver a consultar la caché remota
+            try:
+                dataset_location = remote_cache.resolve_dataset_location(selected_dataset, offline=offline_datasets)
+            except (FileNotFoundError, httpx.HTTPError) as e:
+                st.error(f"No se pudo obtener el dataset: {str(e)}")
+                st.stop()
+            data, llm_summ, _ = summ.summarize(dataset_location, my_config, my_client, encoding=selected_dataset_enc, summary_method=selected_method, approximate=approximate_summary, compact=compact_data)
+            if st.session_state.data is not None:
+                # Liberar el dataset anterior publicado para los procesos de ejecución
+                ChartExecutor().release_dataset(st.session_state.data)
             st.session_state.data = data
+            st.session_state.data_location = dataset_location
+            st.session_state.data_encoding = selected_dataset_enc
+            st.session_state.data_compact = compact_data
+            # None => dataset completo; lista => columnas cargadas hasta ahora
+            st.session_state.data_columns = None if data is not None else []
             st.session_state.llm_summ = llm_summ
             st.session_state.selected_persona = None
             st.session_state.llm_personas = None
@@ -202,6 +289,10 @@ if st.session_state.llm_summ:
         st.write(nfields_df)
     else:
         st.write(str(st.session_state.llm_summ))
+    if st.session_state.data is not None and "compaction" in st.session_state.data.attrs:
+        compaction = st.session_state.data.attrs["compaction"]
+        st.caption(f"Memoria del dataset: {compaction['memory_before'] / 1024 ** 2:.1f} MB -> "
+                   f"{compaction['memory_after'] / 1024 ** 2:.1f} MB ({compaction['memory_saved_pct']}% menos)")
 
     # Personas
     st.sidebar.write("### Personas interesadas en los datos")
@@ -231,8 +322,17 @@ if st.session_state.llm_summ:
         gen_personas_button = st.sidebar.button("Generar Personas")
         if gen_personas_button:
             per = PersonaExplorer()
+            # Cada persona se muestra en cuanto llega completa en el streaming
+            persona_slots = [col.empty() for col in st.columns(3)]
+            streamed_personas = []
+            def show_streamed_persona(persona_data):
+                if len(streamed_personas) < len(persona_slots):
+                    persona_slots[len(streamed_personas)].info(f"*{persona_data.get('persona', '')}*")
+                streamed_personas.append(persona_data)
             with st.spinner("Por favor espere... Generando posibles personas interesadas..."):
-                st.session_state.llm_personas = per.generate(st.session_state.llm_summ, my_config, my_client, n=num_personas)
+                st.session_state.llm_personas = per.generate(st.session_state.llm_summ, my_config, my_client, n=num_personas, on_item=show_streamed_persona)
+            for slot in persona_slots:
+                slot.empty()
         if st.session_state.llm_personas:
             personas_row1 = st.columns(3)
             for idx, col in enumerate(personas_row1[:num_personas]):
@@ -306,8 +406,17 @@ if st.session_state.llm_summ:
             gen_goals_button = st.sidebar.button("Generar objetivos (goals)")
             if gen_goals_button:
                 goal = GoalExplorer()
+                # Cada objetivo se muestra en cuanto llega completo en el streaming
+                goal_slots = [col.empty() for col in st.columns(3)]
+                streamed_goals = []
+                def show_streamed_goal(goal_data):
+                    if len(streamed_goals) < len(goal_slots):
+                        goal_slots[len(streamed_goals)].info(goal_data.get('question', ''))
+                    streamed_goals.append(goal_data)
                 with st.spinner("Por favor espere... Generando objetivos (goals) de visualización..."):
-                    st.session_state.llm_goals = goal.generate(st.session_state.llm_summ, my_config, my_client, persona=st.session_state.selected_persona, n=num_goals)
+                    st.session_state.llm_goals = goal.generate(st.session_state.llm_summ, my_config, my_client, persona=st.session_state.selected_persona, n=num_goals, on_item=show_streamed_goal)
+                for slot in goal_slots:
+                    slot.empty()
             if st.session_state.llm_goals:
                 goals_row1 = st.columns(3)
                 for idx, col in enumerate(goals_row1[:num_goals]):
@@ -336,9 +445,12 @@ if st.session_state.llm_summ:
             gen_viz_button = st.button("Generar Visualización")
             
             if gen_viz_button:
+                # El código se muestra mientras el LLM lo va generando
+                streamed_code = st.empty()
                 with st.spinner("Por favor espere... Generando la visualización..."):
                     vizgen = VizGenerator()
-                    st.session_state.goals_with_code, _ = vizgen.generate(st.session_state.llm_summ, st.session_state.selected_goal, my_config, my_client, library=selected_library)
+                    st.session_state.goals_with_code, _ = vizgen.generate(st.session_state.llm_summ, st.session_state.selected_goal, my_config, my_client, library=selected_library, on_partial=streamed_code.code)
+                streamed_code.empty()
                 
                 #st.write("Código generado para ejecutar:")
                 #st.write(st.session_state.goals_with_code['goals'][0]['code'])
@@ -347,11 +459,12 @@ if st.session_state.llm_summ:
                     chart_ex = ChartExecutor()
                     try:
                         st.session_state.charts = chart_ex.execute(
-                            st.session_state.data,
+                            get_chart_data(st.session_state.goals_with_code),
                             st.session_state.llm_summ,
                             in_goals_with_code=st.session_state.goals_with_code,
                             library=selected_library,
-                            timeout_seconds=30
+                            timeout_seconds=30,
+                            render_options=PREVIEW_RENDER_OPTIONS
                         )
                     except Exception as e:
                         st.error(f"Error inesperado al construir la visualización: {str(e)}")
@@ -370,19 +483,49 @@ if st.session_state.llm_summ:
                     with st.spinner("Por favor espere... Reintentando la visualización..."):
                         chart_ex = ChartExecutor()
                         st.session_state.charts = chart_ex.execute(
-                            st.session_state.data,
+                            get_chart_data(st.session_state.goals_with_code),
                             st.session_state.llm_summ,
                             in_goals_with_code=st.session_state.goals_with_code,
                             library=selected_library,
-                            timeout_seconds=30
+                            timeout_seconds=30,
+                            render_options=PREVIEW_RENDER_OPTIONS
                         )
                     st.rerun()
 
             if st.session_state.charts and st.session_state.goals_with_code:
                 if st.session_state.charts[0].status:
-                    imgdata = base64.b64decode(st.session_state.charts[0].raster)
-                    img = Image.open(io.BytesIO(imgdata))
-                    st.image(img, caption=st.session_state.goals_with_code['goals'][0]['question'], use_container_width=True)
+                    # Vista previa a baja resolución; la versión a 300 dpi solo se genera al exportar
+                    st.image(st.session_state.charts[0].raster, caption=st.session_state.goals_with_code['goals'][0]['question'], use_container_width=True)
+
+                    if st.button("Exportar en alta resolución", key="export_chart_btn"):
+                        with st.spinner("Por favor espere... Generando la imagen en alta resolución..."):
+                            export_goal = {
+                                "goals": [{
+                                    "index": st.session_state.charts[0].index,
+                                    "question": st.session_state.charts[0].goal_question,
+                                    "visualization": st.session_state.charts[0].goal_visualization,
+                                    "rationale": st.session_state.charts[0].goal_rationale,
+                                    "code": st.session_state.charts[0].code,
+                                }]
+                            }
+                            export_charts = ChartExecutor().execute(
+                                get_chart_data(export_goal),
+                                st.session_state.llm_summ,
+                                in_goals_with_code=export_goal,
+                                library=selected_library,
+                                timeout_seconds=30,
+                                render_options=EXPORT_RENDER_OPTIONS
+                            )
+                        if export_charts and export_charts[0].status:
+                            st.download_button(
+                                "Descargar PNG (300 dpi)",
+                                data=export_charts[0].raster,
+                                file_name="visualizacion.png",
+                                mime="image/png",
+                                key="download_chart_btn"
+                            )
+                        else:
+                            st.error("No se pudo generar la imagen en alta resolución")
                     # st.pyplot(st.session_state.charts[0].figure, clear_figure=True)
                     # st.caption(st.session_state.goals_with_code['goals'][0]['question'])
                     
@@ -398,6 +541,7 @@ if st.session_state.llm_summ:
                         )
                         if st.button("Aplicar cambios", key="apply_edit_btn"):
                             st.session_state.edit_prompt = edited_code_input
+                            streamed_code = st.empty()
                             with st.spinner("Por favor espere... Aplicando cambios a la visualización..."):
                                 vized = VizEditor()
                                 edited_code = vized.generate(
@@ -406,8 +550,10 @@ if st.session_state.llm_summ:
                                     st.session_state.edit_prompt,
                                     my_config,
                                     my_client, 
-                                    library="seaborn"
+                                    library="seaborn",
+                                    on_partial=streamed_code.code
                                 )
+                                streamed_code.empty()
                                 goal_with_edited_code = {
                                     "goals": [{
                                         "index": st.session_state.charts[0].index,
@@ -421,11 +567,12 @@ if st.session_state.llm_summ:
                                 with st.spinner("Por favor espere... Construyendo la visualización editada..."):
                                     chart_ex = ChartExecutor()
                                     st.session_state.charts = chart_ex.execute(
-                                        st.session_state.data,
+                                        get_chart_data(goal_with_edited_code),
                                         st.session_state.llm_summ,
                                         in_goals_with_code=goal_with_edited_code,
                                         library="seaborn",
-                                        timeout_seconds=30
+                                        timeout_seconds=30,
+                                        render_options=PREVIEW_RENDER_OPTIONS
                                     )
                             
                             # Reintento para Editar
@@ -435,11 +582,12 @@ if st.session_state.llm_summ:
                                     with st.spinner("Por favor espere... Reintentando la edición..."):
                                         chart_ex = ChartExecutor()
                                         st.session_state.charts = chart_ex.execute(
-                                            st.session_state.data,
+                                            get_chart_data(goal_with_edited_code),
                                             st.session_state.llm_summ,
                                             in_goals_with_code=goal_with_edited_code,
                                             library="seaborn",
-                                            timeout_seconds=30
+                                            timeout_seconds=30,
+                                            render_options=PREVIEW_RENDER_OPTIONS
                                         )
                                     st.rerun()
                             elif st.session_state.charts[0].status:
@@ -470,6 +618,7 @@ if st.session_state.llm_summ:
                             }]
                         }
                         
+                        streamed_code = st.empty()
                         with st.spinner("Por favor espere... Intentando reparar la visualización..."):
                             vizrep = VizRepairer()
                             repaired_code = vizrep.generate(
@@ -479,8 +628,10 @@ if st.session_state.llm_summ:
                                 goal_with_bad_edited_code["goals"][0]['error_traceback'],
                                 my_config,
                                 my_client, 
-                                library="seaborn"
+                                library="seaborn",
+                                on_partial=streamed_code.code
                             )
+                            streamed_code.empty()
                             st.write(repaired_code)
                             
                             goal_with_repaired_code = {
@@ -496,11 +647,12 @@ if st.session_state.llm_summ:
                             with st.spinner("Por favor espere... Construyendo la visualización reparada..."):
                                 chart_ex = ChartExecutor()
                                 st.session_state.charts = chart_ex.execute(
-                                    st.session_state.data,
+                                    get_chart_data(goal_with_repaired_code),
                                     st.session_state.llm_summ,
                                     in_goals_with_code=goal_with_repaired_code,
                                     library="seaborn",
-                                    timeout_seconds=30
+                                    timeout_seconds=30,
+                                    render_options=PREVIEW_RENDER_OPTIONS
                                 )
                         
                         # Reintento para Reparar
@@ -510,11 +662,12 @@ if st.session_state.llm_summ:
                                 with st.spinner("Por favor espere... Reintentando la reparación..."):
                                     chart_ex = ChartExecutor()
                                     st.session_state.charts = chart_ex.execute(
-                                        st.session_state.data,
+                                        get_chart_data(goal_with_repaired_code),
                                         st.session_state.llm_summ,
                                         in_goals_with_code=goal_with_repaired_code,
                                         library="seaborn",
-                                        timeout_seconds=30
+                                        timeout_seconds=30,
+                                        render_options=PREVIEW_RENDER_OPTIONS
                                     )
                                 st.rerun()
                         elif st.session_state.charts[0].status: